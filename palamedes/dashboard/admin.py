@@ -1,5 +1,23 @@
 from django.contrib import admin
-from .models import HousePoint, Due, Task, Announcement
+from django.db import transaction
+from .models import HousePoint, PointBalance, ChapterPointBalance, DuesBalance, ChapterDuesBalance, Due, RecurringDue, Payment, CheckoutSession, Task, Announcement
+from .balances import refresh_point_balances
+from .payments import record_manual_payment
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    # For the payment ledger and the materialized balances: they are only written by the code that keeps
+    # them in step with the dues and points, so a hand edit here would just be drift
+    def get_readonly_fields(self, request, obj=None):
+        return [field.name for field in self.model._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 @admin.register(HousePoint)
 class HousePointAdmin(admin.ModelAdmin):
@@ -7,10 +25,74 @@ class HousePointAdmin(admin.ModelAdmin):
     list_filter = ('status', 'chapter')
     search_fields = ('user__username', 'description')
 
+    # Admin edits bypass the views' balance bookkeeping, so the members and chapters involved (before
+    # and after the edit) are recomputed in the admin's transaction
+    def save_model(self, request, obj, form, change):
+        before = HousePoint.objects.filter(pk=obj.pk).values_list('user_id', 'chapter_id').first() if change else None
+        super().save_model(request, obj, form, change)
+        affected = [(obj.user_id, obj.chapter_id)] + ([before] if before else [])
+        refresh_point_balances([user_id for user_id, _ in affected], [chapter_id for _, chapter_id in affected])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_point_balances([obj.user_id], [obj.chapter_id])
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            affected = list(queryset.values_list('user_id', 'chapter_id'))
+            super().delete_queryset(request, queryset)
+            refresh_point_balances([user_id for user_id, _ in affected], [chapter_id for _, chapter_id in affected])
+
+@admin.register(PointBalance)
+class PointBalanceAdmin(ReadOnlyAdmin):
+    list_display = ('user', 'approved_total', 'approved_count', 'pending_total', 'pending_count', 'updated_at')
+    search_fields = ('user__username',)
+
+@admin.register(ChapterPointBalance)
+class ChapterPointBalanceAdmin(ReadOnlyAdmin):
+    list_display = ('chapter', 'approved_total', 'approved_count', 'pending_total', 'pending_count', 'updated_at')
+
+@admin.register(DuesBalance)
+class DuesBalanceAdmin(ReadOnlyAdmin):
+    list_display = ('user', 'outstanding_total', 'open_count', 'oldest_due_date', 'updated_at')
+    search_fields = ('user__username',)
+
+@admin.register(ChapterDuesBalance)
+class ChapterDuesBalanceAdmin(ReadOnlyAdmin):
+    list_display = ('chapter', 'outstanding_total', 'open_count', 'members_owing', 'oldest_due_date', 'updated_at')
+
 @admin.register(Due)
 class DueAdmin(admin.ModelAdmin):
-    list_display = ('title', 'amount', 'assigned_to', 'is_paid', 'due_date')
+    list_display = ('title', 'amount', 'amount_paid', 'assigned_to', 'is_paid', 'due_date', 'period')
     list_filter = ('is_paid', 'is_template')
+    # What's been paid only moves through the Payment ledger, so it can't be typed in here
+    readonly_fields = ('amount_paid', 'is_paid')
+    actions = ['settle_manually']
+
+    @admin.action(description="Record a manual payment of the remaining balance")
+    def settle_manually(self, request, queryset):
+        with transaction.atomic():
+            dues = list(queryset.select_for_update().filter(is_paid=False))
+            for due in dues:
+                record_manual_payment(due, due.remaining_balance, request.user)
+        self.message_user(request, f"Recorded manual payments on {len(dues)} dues.")
+
+@admin.register(RecurringDue)
+class RecurringDueAdmin(admin.ModelAdmin):
+    list_display = ('template', 'chapter', 'schedule', 'segment', 'is_active', 'ends_on')
+    list_filter = ('schedule', 'segment', 'is_active')
+
+@admin.register(Payment)
+class PaymentAdmin(ReadOnlyAdmin):
+    list_display = ('due', 'amount', 'method', 'provider_session_id', 'recorded_by', 'created_at')
+    list_filter = ('method',)
+    search_fields = ('provider_session_id', 'due__title', 'due__assigned_to__username')
+
+@admin.register(CheckoutSession)
+class CheckoutSessionAdmin(admin.ModelAdmin):
+    list_display = ('session_id', 'user', 'payment_type', 'amount_total', 'status', 'created_at', 'completed_at')
+    list_filter = ('status', 'payment_type')
+    search_fields = ('session_id', 'user__username')
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
@@ -0,0 +1,86 @@
+# dashboard/aging.py
+# Dues aging report: every member's unpaid balance split by how overdue it is.
+# The buckets come from one GROUP BY over the chapter's open dues (bucket membership is a date-range
+# filter on each SUM, so no per-row date math runs in SQL). The result is cached per day under the
+# chapter's data version (see chapter_cache.py).
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import F, Q, Sum, Min
+from django.utils import timezone
+from .models import Due
+from .chapter_cache import cached_for_chapter
+
+# (key, label, days overdue from, days overdue to). Anything not yet 31 days late counts as current.
+AGING_BUCKETS = [
+    ('current', 'Current', None, 30),
+    ('days_30', '31-60 Days', 31, 60),
+    ('days_60', '61-90 Days', 61, 90),
+    ('days_90', '90+ Days', 91, None),
+]
+
+AGING_TIMEOUT = 60 * 60
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _bucket_filter(as_of, low, high):
+    # Days overdue in [low, high] <=> due_date in [as_of - high, as_of - low]
+    condition = Q()
+    if low is not None:
+        condition &= Q(due_date__lte=as_of - timedelta(days=low))
+    if high is not None:
+        condition &= Q(due_date__gte=as_of - timedelta(days=high))
+    return condition
+
+
+def _open_dues(chapter_id):
+    return Due.objects.filter(assigned_to__chapter_id=chapter_id, is_paid=False)
+
+
+def compute_aging(chapter_id, as_of=None):
+    as_of = as_of or timezone.localdate()
+    outstanding = F('amount') - F('amount_paid')
+    buckets = {
+        key: Sum(outstanding, filter=_bucket_filter(as_of, low, high), default=Decimal('0.00'))
+        for key, _, low, high in AGING_BUCKETS
+    }
+
+    rows = list(
+        _open_dues(chapter_id)
+        .values(member_id=F('assigned_to_id'), first_name=F('assigned_to__first_name'),
+                last_name=F('assigned_to__last_name'), status=F('assigned_to__status'))
+        .annotate(total=Sum(outstanding), oldest_due_date=Min('due_date'), **buckets)
+        .order_by('last_name', 'first_name')
+    )
+    totals = {key: sum((row[key] for row in rows), Decimal('0.00')) for key in list(buckets) + ['total']}
+    # Bucket amounts in AGING_BUCKETS order too, for templates (which can't index a dict by a variable)
+    for amounts in rows + [totals]:
+        amounts['buckets'] = [amounts[key] for key in buckets]
+    return {'as_of': as_of, 'rows': rows, 'totals': totals}
+
+
+def get_aging(chapter_id):
+    as_of = timezone.localdate()
+    # The date is part of the key so dues roll into the next bucket at midnight without an invalidation
+    return cached_for_chapter(chapter_id, 'aging', lambda: compute_aging(chapter_id, as_of), as_of.isoformat(),
+                              timeout=AGING_TIMEOUT)
+
+
+def bucket_for(days_overdue):
+    for key, label, low, high in AGING_BUCKETS:
+        if (low is None or days_overdue >= low) and (high is None or days_overdue <= high):
+            return label
+
+
+def iter_aging_csv_rows(chapter_id, as_of=None):
+    # One line per open due, read with a server-side cursor in chunks so memory stays flat however
+    # many rows the chapter has
+    as_of = as_of or timezone.localdate()
+    yield ['Last Name', 'First Name', 'Status', 'Charge', 'Due Date', 'Days Overdue', 'Bucket', 'Amount', 'Paid', 'Outstanding']
+
+    dues = _open_dues(chapter_id).order_by('assigned_to__last_name', 'assigned_to__first_name', 'due_date', 'pk').values_list(
+        'assigned_to__last_name', 'assigned_to__first_name', 'assigned_to__status', 'title', 'due_date', 'amount', 'amount_paid'
+    )
+    for last_name, first_name, status, title, due_date, amount, amount_paid in dues.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        days_overdue = max((as_of - due_date).days, 0)
+        yield [last_name, first_name, status, title, due_date.isoformat(), days_overdue, bucket_for(days_overdue),
+               amount, amount_paid, amount - amount_paid]
@@ -0,0 +1,187 @@
+# dashboard/balances.py
+# Bookkeeping for PointBalance / ChapterPointBalance.
+# Every view that changes a HousePoint's status or amount reports the change here,
+# inside the same transaction as the HousePoint write.
+from collections import defaultdict
+from django.db.models import F, Sum, Count, Q
+from users.models import Chapter
+from .models import HousePoint, PointBalance, ChapterPointBalance
+from .chapter_cache import bump_chapter_versions
+from .summary import invalidate_summaries
+
+BALANCE_FIELDS = ('approved_total', 'approved_count', 'pending_total', 'pending_count')
+
+# Keep IN (...) lists under SQLite's variable limit
+CHUNK_SIZE = 500
+
+
+def point_contribution(status, amount):
+    # What a single HousePoint adds to the balance columns (same order as BALANCE_FIELDS)
+    if status == 'APPROVED':
+        return (amount, 1, 0, 0)
+    if status == 'PENDING':
+        return (0, 0, amount, 1)
+    return (0, 0, 0, 0)
+
+
+def point_delta(old_status, old_amount, new_status, new_amount):
+    old = point_contribution(old_status, old_amount)
+    new = point_contribution(new_status, new_amount)
+    return tuple(n - o for n, o in zip(new, old))
+
+
+def record_point_change(point, old_status=None, old_amount=0):
+    # old_status=None means the point was just created
+    delta = point_delta(old_status, old_amount, point.status, point.amount)
+    apply_point_deltas({(point.user_id, point.chapter_id): delta})
+
+
+def apply_point_deltas(deltas):
+    # deltas: {(user_id, chapter_id): delta tuple}
+    # Members that share the same delta (e.g. a bulk award) are updated with a single UPDATE.
+    deltas = {key: delta for key, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+
+    users_by_delta = defaultdict(list)
+    chapter_deltas = defaultdict(lambda: (0, 0, 0, 0))
+    for (user_id, chapter_id), delta in deltas.items():
+        users_by_delta[delta].append(user_id)
+        if chapter_id is not None:
+            chapter_deltas[chapter_id] = tuple(a + b for a, b in zip(chapter_deltas[chapter_id], delta))
+
+    user_ids = [user_id for user_id, _ in deltas]
+    ensure_balance_rows(PointBalance, 'user_id', user_ids)
+    for delta, ids in users_by_delta.items():
+        for i in range(0, len(ids), CHUNK_SIZE):
+            PointBalance.objects.filter(user_id__in=ids[i:i + CHUNK_SIZE]).update(**_increments(delta))
+
+    ensure_balance_rows(ChapterPointBalance, 'chapter_id', list(chapter_deltas))
+    for chapter_id, delta in chapter_deltas.items():
+        ChapterPointBalance.objects.filter(chapter_id=chapter_id).update(**_increments(delta))
+
+    invalidate_summaries(user_ids)
+    bump_chapter_versions(chapter_deltas)
+
+
+def refresh_point_balances(user_ids, chapter_ids):
+    # Recomputes these members' and chapters' rows from the ledger. For writes that don't know the old
+    # status and amount (the admin); the views report exact deltas instead.
+    user_ids = sorted({user_id for user_id in user_ids if user_id})
+    chapter_ids = sorted({chapter_id for chapter_id in chapter_ids if chapter_id})
+
+    ensure_balance_rows(PointBalance, 'user_id', user_ids)
+    for i in range(0, len(user_ids), CHUNK_SIZE):
+        chunk = user_ids[i:i + CHUNK_SIZE]
+        rows = HousePoint.objects.filter(user_id__in=chunk).values('user_id').annotate(**_ledger_aggregates())
+        totals = {row['user_id']: tuple(row[f] for f in BALANCE_FIELDS) for row in rows}
+        for user_id in chunk:
+            PointBalance.objects.filter(user_id=user_id).update(**dict(zip(BALANCE_FIELDS, totals.get(user_id, (0, 0, 0, 0)))))
+
+    ensure_balance_rows(ChapterPointBalance, 'chapter_id', chapter_ids)
+    rows = HousePoint.objects.filter(chapter_id__in=chapter_ids).values('chapter_id').annotate(**_ledger_aggregates())
+    totals = {row['chapter_id']: tuple(row[f] for f in BALANCE_FIELDS) for row in rows}
+    for chapter_id in chapter_ids:
+        ChapterPointBalance.objects.filter(chapter_id=chapter_id).update(**dict(zip(BALANCE_FIELDS, totals.get(chapter_id, (0, 0, 0, 0)))))
+
+    invalidate_summaries(user_ids)
+    bump_chapter_versions(chapter_ids)
+
+
+def get_point_balance(user):
+    # Unsaved zero balance for members who have never had a point recorded
+    return PointBalance.objects.filter(user=user).first() or PointBalance(user=user)
+
+
+def ensure_balance_rows(model, key, ids):
+    # Creates any missing zero rows so the UPDATEs that follow always have a row to hit
+    for i in range(0, len(ids), CHUNK_SIZE):
+        model.objects.bulk_create(
+            [model(**{key: pk}) for pk in ids[i:i + CHUNK_SIZE]],
+            ignore_conflicts=True
+        )
+
+
+def _increments(delta):
+    return {field: F(field) + value for field, value in zip(BALANCE_FIELDS, delta) if value}
+
+
+# Rebuild / Verify (used by the rebuild_point_balances command)
+
+def _ledger_aggregates():
+    return dict(
+        approved_total=Sum('amount', filter=Q(status='APPROVED'), default=0),
+        approved_count=Count('id', filter=Q(status='APPROVED')),
+        pending_total=Sum('amount', filter=Q(status='PENDING'), default=0),
+        pending_count=Count('id', filter=Q(status='PENDING')),
+    )
+
+
+def expected_member_balances(chapter=None):
+    qs = HousePoint.objects.all()
+    if chapter is not None:
+        qs = qs.filter(user__chapter=chapter)
+    rows = qs.values('user_id').annotate(**_ledger_aggregates())
+    return {row['user_id']: tuple(row[f] for f in BALANCE_FIELDS) for row in rows}
+
+
+def expected_chapter_balances(chapter=None):
+    qs = HousePoint.objects.filter(chapter__isnull=False)
+    if chapter is not None:
+        qs = qs.filter(chapter=chapter)
+    rows = qs.values('chapter_id').annotate(**_ledger_aggregates())
+    return {row['chapter_id']: tuple(row[f] for f in BALANCE_FIELDS) for row in rows}
+
+
+def find_balance_mismatches(chapter=None):
+    # Returns a list of (kind, id, stored, expected) for every balance that has drifted from the ledger
+    mismatches = []
+
+    stored = PointBalance.objects.all()
+    if chapter is not None:
+        stored = stored.filter(user__chapter=chapter)
+    stored = {row[0]: tuple(row[1:]) for row in stored.values_list('user_id', *BALANCE_FIELDS)}
+    expected = expected_member_balances(chapter)
+    for user_id in stored.keys() | expected.keys():
+        have = stored.get(user_id, (0, 0, 0, 0))
+        want = expected.get(user_id, (0, 0, 0, 0))
+        if have != want:
+            mismatches.append(('member', user_id, have, want))
+
+    stored = ChapterPointBalance.objects.all()
+    if chapter is not None:
+        stored = stored.filter(chapter=chapter)
+    stored = {row[0]: tuple(row[1:]) for row in stored.values_list('chapter_id', *BALANCE_FIELDS)}
+    expected = expected_chapter_balances(chapter)
+    for chapter_id in stored.keys() | expected.keys():
+        have = stored.get(chapter_id, (0, 0, 0, 0))
+        want = expected.get(chapter_id, (0, 0, 0, 0))
+        if have != want:
+            mismatches.append(('chapter', chapter_id, have, want))
+
+    return mismatches
+
+
+def rebuild_balances(chapter=None):
+    # Throw away the stored totals and recompute them from the raw HousePoint ledger
+    member_rows = PointBalance.objects.all()
+    chapter_rows = ChapterPointBalance.objects.all()
+    if chapter is not None:
+        member_rows = member_rows.filter(user__chapter=chapter)
+        chapter_rows = chapter_rows.filter(chapter=chapter)
+    member_rows.delete()
+    chapter_rows.delete()
+
+    members = expected_member_balances(chapter)
+    PointBalance.objects.bulk_create(
+        [PointBalance(user_id=user_id, **dict(zip(BALANCE_FIELDS, values))) for user_id, values in members.items()],
+        batch_size=CHUNK_SIZE
+    )
+    chapters = expected_chapter_balances(chapter)
+    ChapterPointBalance.objects.bulk_create(
+        [ChapterPointBalance(chapter_id=chapter_id, **dict(zip(BALANCE_FIELDS, values))) for chapter_id, values in chapters.items()],
+        batch_size=CHUNK_SIZE
+    )
+
+    bump_chapter_versions([chapter.id] if chapter is not None else Chapter.objects.values_list('id', flat=True))
+    return len(members), len(chapters)
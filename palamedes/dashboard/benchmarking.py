@@ -0,0 +1,44 @@
+# dashboard/benchmarking.py
+# Shared helpers for the bench_* management commands.
+# They run against the configured database, so every benchmark works inside a throwaway chapter
+# that is deleted (with everything hanging off it) when the run is over.
+import secrets
+import time
+from contextlib import contextmanager
+from users.models import Chapter, Position, CustomUser
+
+BENCH_CHUNK_SIZE = 500
+
+
+@contextmanager
+def scratch_chapter(member_count):
+    code = secrets.token_hex(4).upper()
+    chapter = Chapter.objects.create(name=f"Benchmark {code}", university="Benchmark University", invite_code=code)
+    position = Position.objects.create(chapter=chapter, title="President", can_manage_points=True, can_manage_finance=True)
+    CustomUser.objects.bulk_create(
+        [
+            CustomUser(
+                username=f"bench_{code.lower()}_{i}", password='!', chapter=chapter,
+                first_name=f"Member{i}", last_name="Bench", status='NM' if i % 2 else 'ACT',
+                pledge_semester='Fall', pledge_year=2020 + i % 5
+            )
+            for i in range(member_count)
+        ],
+        batch_size=BENCH_CHUNK_SIZE
+    )
+    officer = CustomUser.objects.create(username=f"bench_{code.lower()}_officer", password='!', chapter=chapter, position=position, status='ACT')
+    try:
+        yield chapter, officer
+    finally:
+        chapter.delete()
+
+
+def timed(func, *args, **kwargs):
+    # Returns (seconds, result)
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+def parse_sizes(value):
+    return [int(size) for size in value.split(',') if size.strip()]
@@ -0,0 +1,83 @@
+# dashboard/bulk.py
+# Set-based versions of the "do X for every member in a group" actions.
+# One transaction, chunked multi-row INSERTs, and bookkeeping once per batch instead of once per row.
+from django.db import transaction
+from users.models import CustomUser
+from .models import HousePoint, Due
+from .balances import apply_point_deltas, point_delta
+from .dues_balances import refresh_dues_balances
+
+BULK_CHUNK_SIZE = 500
+
+
+def resolve_target_members(chapter, data, selected_ids=()):
+    # Turns the target_group choice from BulkPointForm / BulkDueForm into a queryset of members.
+    # selected_ids is the directory selection (selection.get_selection) for target_group SELECTED.
+    target = data.get('target_group')
+    members = CustomUser.objects.filter(chapter=chapter)
+
+    if target == 'ALL':
+        return members
+    if target == 'ACTIVES':
+        return members.exclude(status='NM')
+    if target == 'NMS':
+        return members.filter(status='NM')
+    if target == 'PLEDGE_CLASS':
+        if data.get('pledge_semester') and data.get('pledge_year'):
+            return members.filter(pledge_semester=data['pledge_semester'], pledge_year=data['pledge_year'])
+    elif target == 'SELECTED':
+        if selected_ids:
+            return members.filter(id__in=selected_ids)
+    return members.none()
+
+
+def bulk_assign_points(user_ids, approver, chapter, amount, description, date_for):
+    # Creates one APPROVED HousePoint per member and returns how many were created
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+
+    delta = point_delta(None, 0, 'APPROVED', amount)
+    with transaction.atomic():
+        HousePoint.objects.bulk_create(
+            [
+                HousePoint(
+                    user_id=user_id,
+                    submitted_by=approver,
+                    chapter=chapter,
+                    amount=amount,
+                    description=description,
+                    date_for=date_for,
+                    status='APPROVED', # Admin actions are auto-approved
+                    assigned_approver=approver
+                )
+                for user_id in user_ids
+            ],
+            batch_size=BULK_CHUNK_SIZE
+        )
+        # Everyone got the same amount, so this is one UPDATE per chunk of members
+        apply_point_deltas({(user_id, chapter.id if chapter else None): delta for user_id in user_ids})
+    return len(user_ids)
+
+
+def bulk_charge_dues(members, title, amount, due_date):
+    # Bills every member in one transaction. Returns a summary of who was charged:
+    # {'count': 3, 'total': Decimal('150.00'), 'members': [(id, 'First Last'), ...]}
+    charged = [
+        (pk, f"{first_name} {last_name}".strip() or username)
+        for pk, first_name, last_name, username in members.values_list('id', 'first_name', 'last_name', 'username')
+    ]
+
+    with transaction.atomic():
+        Due.objects.bulk_create(
+            [Due(title=title, amount=amount, due_date=due_date, assigned_to_id=pk) for pk, _ in charged],
+            batch_size=BULK_CHUNK_SIZE
+        )
+        # bulk_create skips the post_save signal
+        refresh_dues_balances([pk for pk, _ in charged])
+
+    return {
+        'count': len(charged),
+        'total': amount * len(charged),
+        'members': charged,
+    }
@@ -0,0 +1,40 @@
+# dashboard/cache_backends.py
+# LockedFileCache, the file:// backend palamedes/caches.py picks: Django's file cache with add() and
+# incr() made atomic between processes (a lock file in the cache directory), so two workers bumping the
+# same chapter version can't both write v+1. locmem and Redis are Django's own backends.
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no cross-process lock, which is fine for a single development server
+    fcntl = None
+
+
+class LockedFileCache(FileBasedCache):
+    def _locked(self):
+        self._createdir()
+        return _FileLock(f'{self._dir}/.lock')
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._locked():
+            return super().add(key, value, timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        with self._locked():
+            return super().incr(key, delta, version)
+
+
+class _FileLock:
+    def __init__(self, path):
+        self.path = path
+
+    def __enter__(self):
+        self.file = open(self.path, 'a')
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        # Closing the file releases the lock
+        self.file.close()
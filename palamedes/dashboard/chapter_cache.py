@@ -0,0 +1,63 @@
+# dashboard/chapter_cache.py
+# Per-chapter data versions for the cache.
+# Everything cached for a chapter (leaderboard, announcements, aging report) has the chapter's current
+# data version in its key. Any write to the chapter's points, dues, announcements or members bumps the
+# version: one cache operation however many entries the chapter has. The old entries are never asked
+# for again and just expire. Per-member entries (the dashboard summary) are still deleted by key.
+import time
+from django.core.cache import cache
+from django.db import transaction
+
+# How long a chapter entry lives at most, whether or not anything changed
+CHAPTER_CACHE_TIMEOUT = 60 * 60
+
+
+def version_key(chapter_id):
+    return f'dashboard:chapter_version:{chapter_id}'
+
+
+def _fresh_version():
+    # Versions start from the clock (in microseconds), so a version that was evicted and recreated is
+    # still bigger than anything handed out before: entries cached under an old one can't come back.
+    return time.time_ns() // 1000
+
+
+def chapter_version(chapter_id):
+    key = version_key(chapter_id)
+    version = cache.get(key)
+    if version is None:
+        version = _fresh_version()
+        if not cache.add(key, version, None):
+            # Somebody else just started it
+            version = cache.get(key, version)
+    return version
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Nothing cached under this chapter's version right now, so nothing to invalidate
+            pass
+
+
+def bump_chapter_versions(chapter_ids):
+    # Runs after the commit, otherwise another request could cache the old data under the new version
+    keys = [version_key(chapter_id) for chapter_id in set(chapter_ids) if chapter_id]
+    if keys:
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def chapter_cache_key(chapter_id, name, *parts):
+    return ':'.join(['dashboard', name, str(chapter_id), f'v{chapter_version(chapter_id)}', *map(str, parts)])
+
+
+def cached_for_chapter(chapter_id, name, compute, *parts, timeout=CHAPTER_CACHE_TIMEOUT):
+    # compute() under the chapter's current version, from the cache when possible
+    key = chapter_cache_key(chapter_id, name, *parts)
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
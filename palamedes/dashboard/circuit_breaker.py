@@ -0,0 +1,84 @@
+# dashboard/circuit_breaker.py
+# Circuit breaker for calls to an outside service (the payment provider).
+# While the service is healthy every call goes through (closed). Once enough of the recent calls have
+# failed, calls are refused straight away for a cool-down (open) so workers don't queue up behind a
+# dead dependency. After the cool-down one trial call is let through (half open): if it works the
+# breaker closes, if not it opens again.
+import threading
+import time
+from collections import deque
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED, HALF_OPEN, OPEN = 'closed', 'half_open', 'open'
+
+    def __init__(self, window=20, min_calls=5, failure_rate=0.5, reset_timeout=30, clock=time.monotonic, on_change=None):
+        # Opens when at least min_calls of the last `window` calls were made and failure_rate of them failed
+        self.outcomes = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.on_change = on_change
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.opened_at = None
+        self.probing = False
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            if self.on_change:
+                self.on_change(state)
+
+    def before_call(self):
+        # Raises CircuitOpen if the call shouldn't be attempted
+        with self.lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    raise CircuitOpen()
+                self._set_state(self.HALF_OPEN)
+            if self.state == self.HALF_OPEN:
+                # Only one trial call at a time; everyone else keeps failing fast until it reports back
+                if self.probing:
+                    raise CircuitOpen()
+                self.probing = True
+
+    def record(self, succeeded):
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.probing = False
+                if succeeded:
+                    self.outcomes.clear()
+                    self._set_state(self.CLOSED)
+                else:
+                    self._trip()
+                return
+
+            self.outcomes.append(succeeded)
+            failures = self.outcomes.count(False)
+            if len(self.outcomes) >= self.min_calls and failures >= self.failure_rate * len(self.outcomes):
+                self._trip()
+
+    def _trip(self):
+        self.opened_at = self.clock()
+        self._set_state(self.OPEN)
+
+    def call(self, func, *args, failure_exceptions=(Exception,), **kwargs):
+        # Runs func through the breaker. Only failure_exceptions count as the service failing; anything
+        # else (e.g. a request the service rejected as invalid) still proves it's up.
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except failure_exceptions:
+            self.record(False)
+            raise
+        except BaseException:
+            self.record(True)
+            raise
+        self.record(True)
+        return result
@@ -0,0 +1,170 @@
+# dashboard/dues_balances.py
+# Bookkeeping for DuesBalance / ChapterDuesBalance.
+# Whatever creates a charge or records a payment calls refresh_dues_balances with the affected members,
+# inside the same transaction. The oldest open due can't be maintained with +/- increments (paying it
+# off means finding the next one), so each affected member's row is recomputed from their open dues with
+# one correlated UPDATE. That only ever reads those members' open dues, via due_assignee_paid_date_idx.
+from decimal import Decimal
+from django.db.models import F, Sum, Count, Min, OuterRef, Subquery, Value, DecimalField, IntegerField
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from users.models import Chapter, CustomUser
+from .models import Due, DuesBalance, ChapterDuesBalance
+from .balances import ensure_balance_rows, CHUNK_SIZE
+from .summary import invalidate_summaries
+from .chapter_cache import bump_chapter_versions
+
+MEMBER_FIELDS = ('outstanding_total', 'open_count', 'oldest_due_date')
+CHAPTER_FIELDS = ('outstanding_total', 'open_count', 'members_owing', 'oldest_due_date')
+
+ZERO = Decimal('0.00')
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _scalar(queryset, output_field, default):
+    # Aggregate subquery that reads as `default` when there's nothing to aggregate
+    value = Subquery(queryset, output_field=output_field)
+    return value if default is None else Coalesce(value, Value(default), output_field=output_field)
+
+
+def _member_columns():
+    open_dues = Due.objects.filter(assigned_to=OuterRef('user_id'), is_paid=False).values('assigned_to')
+    return dict(
+        outstanding_total=_scalar(open_dues.annotate(v=Sum(F('amount') - F('amount_paid'))).values('v'), MONEY, ZERO),
+        open_count=_scalar(open_dues.annotate(v=Count('id')).values('v'), IntegerField(), 0),
+        oldest_due_date=_scalar(open_dues.annotate(v=Min('due_date')).values('v'), Due._meta.get_field('due_date'), None),
+        updated_at=timezone.now(),
+    )
+
+
+def _chapter_columns():
+    owing = DuesBalance.objects.filter(user__chapter=OuterRef('chapter_id'), open_count__gt=0).values('user__chapter')
+    return dict(
+        outstanding_total=_scalar(owing.annotate(v=Sum('outstanding_total')).values('v'), MONEY, ZERO),
+        open_count=_scalar(owing.annotate(v=Sum('open_count')).values('v'), IntegerField(), 0),
+        members_owing=_scalar(owing.annotate(v=Count('id')).values('v'), IntegerField(), 0),
+        oldest_due_date=_scalar(owing.annotate(v=Min('oldest_due_date')).values('v'), Due._meta.get_field('due_date'), None),
+        updated_at=timezone.now(),
+    )
+
+
+def refresh_dues_balances(user_ids, create_missing=True):
+    # create_missing=False is for deletes, where the member (and their balance row) may be going away too
+    user_ids = sorted({user_id for user_id in user_ids if user_id})
+    if not user_ids:
+        return
+
+    if create_missing:
+        ensure_balance_rows(DuesBalance, 'user_id', user_ids)
+    for i in range(0, len(user_ids), CHUNK_SIZE):
+        DuesBalance.objects.filter(user_id__in=user_ids[i:i + CHUNK_SIZE]).update(**_member_columns())
+
+    chapter_ids = set()
+    for i in range(0, len(user_ids), CHUNK_SIZE):
+        chapter_ids.update(
+            CustomUser.objects.filter(pk__in=user_ids[i:i + CHUNK_SIZE], chapter__isnull=False)
+            .values_list('chapter_id', flat=True).distinct()
+        )
+    refresh_chapter_dues_balances(chapter_ids, create_missing)
+    invalidate_summaries(user_ids)
+
+
+def refresh_chapter_dues_balances(chapter_ids, create_missing=True):
+    chapter_ids = sorted(chapter_ids)
+    if create_missing:
+        ensure_balance_rows(ChapterDuesBalance, 'chapter_id', chapter_ids)
+    if chapter_ids:
+        ChapterDuesBalance.objects.filter(chapter_id__in=chapter_ids).update(**_chapter_columns())
+    bump_chapter_versions(chapter_ids)
+
+
+def get_dues_balance(user):
+    # Unsaved zero balance for members who have never been billed
+    return DuesBalance.objects.filter(user=user).first() or DuesBalance(user=user)
+
+
+def get_chapter_dues_balance(chapter_id):
+    return ChapterDuesBalance.objects.filter(chapter_id=chapter_id).first() or ChapterDuesBalance(chapter_id=chapter_id)
+
+
+# Rebuild / Verify (used by the rebuild_dues_balances command)
+
+def expected_member_dues(chapter=None):
+    qs = Due.objects.filter(is_paid=False, assigned_to__isnull=False)
+    if chapter is not None:
+        qs = qs.filter(assigned_to__chapter=chapter)
+    rows = qs.values('assigned_to_id').annotate(
+        outstanding_total=Sum(F('amount') - F('amount_paid')),
+        open_count=Count('id'),
+        oldest_due_date=Min('due_date'),
+    )
+    return {row['assigned_to_id']: tuple(row[f] for f in MEMBER_FIELDS) for row in rows}
+
+
+def expected_chapter_dues(chapter=None):
+    qs = Due.objects.filter(is_paid=False, assigned_to__chapter__isnull=False)
+    if chapter is not None:
+        qs = qs.filter(assigned_to__chapter=chapter)
+    rows = qs.values('assigned_to__chapter_id').annotate(
+        outstanding_total=Sum(F('amount') - F('amount_paid')),
+        open_count=Count('id'),
+        members_owing=Count('assigned_to_id', distinct=True),
+        oldest_due_date=Min('due_date'),
+    )
+    return {row['assigned_to__chapter_id']: tuple(row[f] for f in CHAPTER_FIELDS) for row in rows}
+
+
+def find_dues_mismatches(chapter=None):
+    # Returns a list of (kind, id, stored, expected) for every balance that has drifted from the dues
+    mismatches = []
+
+    stored = DuesBalance.objects.all()
+    if chapter is not None:
+        stored = stored.filter(user__chapter=chapter)
+    stored = {row[0]: tuple(row[1:]) for row in stored.values_list('user_id', *MEMBER_FIELDS)}
+    expected = expected_member_dues(chapter)
+    for user_id in stored.keys() | expected.keys():
+        have = stored.get(user_id, (ZERO, 0, None))
+        want = expected.get(user_id, (ZERO, 0, None))
+        if have != want:
+            mismatches.append(('member', user_id, have, want))
+
+    stored = ChapterDuesBalance.objects.all()
+    if chapter is not None:
+        stored = stored.filter(chapter=chapter)
+    stored = {row[0]: tuple(row[1:]) for row in stored.values_list('chapter_id', *CHAPTER_FIELDS)}
+    expected = expected_chapter_dues(chapter)
+    for chapter_id in stored.keys() | expected.keys():
+        have = stored.get(chapter_id, (ZERO, 0, 0, None))
+        want = expected.get(chapter_id, (ZERO, 0, 0, None))
+        if have != want:
+            mismatches.append(('chapter', chapter_id, have, want))
+
+    return mismatches
+
+
+def rebuild_dues_balances(chapter=None):
+    # Throw away the stored balances and recompute them from the Due table
+    member_rows = DuesBalance.objects.all()
+    chapter_rows = ChapterDuesBalance.objects.all()
+    if chapter is not None:
+        member_rows = member_rows.filter(user__chapter=chapter)
+        chapter_rows = chapter_rows.filter(chapter=chapter)
+    member_rows.delete()
+    chapter_rows.delete()
+
+    members = expected_member_dues(chapter)
+    DuesBalance.objects.bulk_create(
+        [DuesBalance(user_id=user_id, **dict(zip(MEMBER_FIELDS, values))) for user_id, values in members.items()],
+        batch_size=CHUNK_SIZE
+    )
+    chapters = expected_chapter_dues(chapter)
+    ChapterDuesBalance.objects.bulk_create(
+        [ChapterDuesBalance(chapter_id=chapter_id, **dict(zip(CHAPTER_FIELDS, values))) for chapter_id, values in chapters.items()],
+        batch_size=CHUNK_SIZE
+    )
+
+    users = CustomUser.objects.all() if chapter is None else CustomUser.objects.filter(chapter=chapter)
+    invalidate_summaries(users.values_list('pk', flat=True))
+    bump_chapter_versions([chapter.id] if chapter is not None else Chapter.objects.values_list('id', flat=True))
+    return len(members), len(chapters)
@@ -0,0 +1,203 @@
+# dashboard/fake_redis.py
+# A small in-process server speaking the Redis protocol, with just the commands Django's RedisCache
+# (through redis-py) uses, so the redis:// cache can be exercised by the tests without a Redis install.
+import socketserver
+import threading
+import time
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address=('127.0.0.1', 0), password=''):
+        super().__init__(address, FakeRedisHandler)
+        self.password = password
+        self.lock = threading.RLock()
+        # db number -> {key: (value, expires at or None)}
+        self.data = {}
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f'redis://{":" + self.password + "@" if self.password else ""}{host}:{port}/0'
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def start_fake_redis(password=''):
+    # Returns a running server; call server.stop() when done
+    server = FakeRedisServer(password=password)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FakeRedisHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.db = 0
+        self.authenticated = not self.server.password
+        self.protocol = 2
+        # Commands queued between MULTI and EXEC (redis-py pipelines)
+        self.queued = None
+        while True:
+            command = self.read_command()
+            if command is None:
+                return
+            self.reply(self.dispatch(command))
+
+    def dispatch(self, command):
+        name, args = command[0].upper().decode(), command[1:]
+        if not self.authenticated and name not in ('AUTH', 'HELLO'):
+            return Error('NOAUTH Authentication required.')
+        if self.queued is not None and name not in ('EXEC', 'DISCARD'):
+            self.queued.append(command)
+            return 'QUEUED'
+        handler = getattr(self, f'cmd_{name.lower()}', None)
+        if handler is None:
+            return Error(f"ERR unknown command '{name}'")
+        with self.server.lock:
+            return handler(*args)
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line.startswith(b'*'):
+            return None
+        command = []
+        for _ in range(int(line[1:])):
+            length = int(self.rfile.readline()[1:])
+            command.append(self.rfile.read(length + 2)[:-2])
+        return command
+
+    def reply(self, value):
+        self.wfile.write(encode_reply(value, self.protocol))
+
+    # Storage
+
+    @property
+    def store(self):
+        return self.server.data.setdefault(self.db, {})
+
+    def lookup(self, key):
+        value, expires = self.store.get(key, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self.store[key]
+            return None
+        return value
+
+    def expiry(self, key):
+        return self.store[key][1]
+
+    # Commands
+
+    def cmd_ping(self):
+        return 'PONG'
+
+    def cmd_auth(self, password):
+        if password.decode() != self.server.password:
+            return Error('WRONGPASS invalid password')
+        self.authenticated = True
+        return 'OK'
+
+    def cmd_hello(self, protocol=b'2', *options):
+        # redis-py authenticates with HELLO 3 AUTH <user> <password>. The only RESP3 reply used here is
+        # its null; everything else is encoded the same in both versions.
+        if b'AUTH' in [option.upper() for option in options]:
+            password = options[[option.upper() for option in options].index(b'AUTH') + 2]
+            reply = self.cmd_auth(password)
+            if isinstance(reply, Error):
+                return reply
+        if not self.authenticated:
+            return Error('NOAUTH HELLO must be called with the client already authenticated')
+        self.protocol = int(protocol)
+        return ['server', 'redis', 'version', '7.0.0', 'proto', int(protocol), 'mode', 'standalone']
+
+    def cmd_multi(self):
+        self.queued = []
+        return 'OK'
+
+    def cmd_exec(self):
+        queued, self.queued = self.queued or [], None
+        return [self.dispatch(command) for command in queued]
+
+    def cmd_discard(self):
+        self.queued = None
+        return 'OK'
+
+    def cmd_select(self, db):
+        self.db = int(db)
+        return 'OK'
+
+    def cmd_get(self, key):
+        return self.lookup(key)
+
+    def cmd_mget(self, *keys):
+        return [self.lookup(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        options = [option.upper() for option in options]
+        expires = None
+        for unit, scale in ((b'PX', 1000), (b'EX', 1)):
+            if unit in options:
+                expires = time.monotonic() + int(options[options.index(unit) + 1]) / scale
+        if b'NX' in options and self.lookup(key) is not None:
+            return None
+        self.store[key] = (value, expires)
+        return 'OK'
+
+    def cmd_mset(self, *pairs):
+        for key, value in zip(pairs[::2], pairs[1::2]):
+            self.store[key] = (value, None)
+        return 'OK'
+
+    def cmd_del(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys if self.lookup(key) is not None)
+
+    def cmd_exists(self, *keys):
+        return sum(self.lookup(key) is not None for key in keys)
+
+    def cmd_incrby(self, key, delta):
+        value = self.lookup(key)
+        try:
+            number = int(value or 0) + int(delta)
+        except ValueError:
+            return Error('ERR value is not an integer or out of range')
+        self.store[key] = (str(number).encode(), self.expiry(key) if value is not None else None)
+        return number
+
+    def cmd_expire(self, key, seconds):
+        value = self.lookup(key)
+        if value is None:
+            return 0
+        self.store[key] = (value, time.monotonic() + int(seconds))
+        return 1
+
+    def cmd_persist(self, key):
+        value = self.lookup(key)
+        if value is None or self.expiry(key) is None:
+            return 0
+        self.store[key] = (value, None)
+        return 1
+
+    def cmd_flushdb(self):
+        self.store.clear()
+        return 'OK'
+
+
+class Error(str):
+    pass
+
+
+def encode_reply(value, protocol=2):
+    if isinstance(value, Error):
+        return f'-{value}\r\n'.encode()
+    if isinstance(value, str):
+        return f'+{value}\r\n'.encode()
+    if isinstance(value, int):
+        return f':{value}\r\n'.encode()
+    if value is None:
+        return b'_\r\n' if protocol == 3 else b'$-1\r\n'
+    if isinstance(value, list):
+        return f'*{len(value)}\r\n'.encode() + b''.join(encode_reply(item, protocol) for item in value)
+    return b'$%d\r\n%s\r\n' % (len(value), value)
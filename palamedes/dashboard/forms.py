@@ -109,9 +109,6 @@ class BulkDueForm(forms.Form):
     ]
     target_group = forms.ChoiceField(choices=TARGET_CHOICES)
 
-    # Hidden field to store the comma-separated list of IDs passed from the directory
-    selected_user_ids = forms.CharField(widget=forms.HiddenInput(), required=False)
-
     # Optional fields for Pledge Class
     pledge_semester = forms.ChoiceField(choices=[('Fall', 'Fall'), ('Spring', 'Spring')], required=False)
     pledge_year = forms.IntegerField(required=False, help_text="Required if Pledge Class is selected")
@@ -137,9 +134,6 @@ class BulkPointForm(forms.Form):
     ]
     target_group = forms.ChoiceField(choices=TARGET_CHOICES)
     
-    # Hidden field to store IDs
-    selected_user_ids = forms.CharField(widget=forms.HiddenInput(), required=False)
-
     # Optional Filters
     pledge_semester = forms.ChoiceField(choices=[('Fall', 'Fall'), ('Spring', 'Spring')], required=False)
     pledge_year = forms.IntegerField(required=False)
@@ -0,0 +1,35 @@
+# dashboard/leaderboard.py
+# Chapter leaderboard, ranked in SQL and cached under the chapter's data version (see chapter_cache.py),
+# so any change to the chapter's points or members brings a fresh one.
+from django.db.models import F, Value, Case, When, CharField, Window
+from django.db.models.functions import Coalesce, Rank
+from users.models import CustomUser
+from .chapter_cache import chapter_cache_key, cached_for_chapter
+
+LEADERBOARD_TIMEOUT = 60 * 15
+
+
+def leaderboard_cache_key(chapter_id):
+    return chapter_cache_key(chapter_id, 'leaderboard')
+
+
+def compute_leaderboard(chapter_id):
+    # NMs and Actives are ranked separately. Ties share a rank (1, 2, 2, 4).
+    rows = CustomUser.objects.filter(chapter_id=chapter_id).annotate(
+        total_points_val=Coalesce(F('point_balance__approved_total'), 0),
+        board=Case(When(status='NM', then=Value('NM')), default=Value('ACT'), output_field=CharField()),
+    ).annotate(
+        rank=Window(Rank(), partition_by=[F('board')], order_by=F('total_points_val').desc()),
+    ).order_by('board', 'rank', 'first_name', 'last_name').values(
+        'id', 'first_name', 'last_name', 'status', 'board', 'total_points_val', 'rank'
+    )
+
+    leaderboard = {'ACT': [], 'NM': []}
+    for row in rows:
+        leaderboard[row.pop('board')].append(row)
+    return leaderboard
+
+
+def get_leaderboard(chapter_id):
+    # Returns {'ACT': [...], 'NM': [...]} of plain dicts, straight from the cache when possible
+    return cached_for_chapter(chapter_id, 'leaderboard', lambda: compute_leaderboard(chapter_id), timeout=LEADERBOARD_TIMEOUT)
@@ -0,0 +1,35 @@
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from dashboard.models import Due
+from dashboard.bulk import bulk_charge_dues
+from dashboard.benchmarking import scratch_chapter, timed, parse_sizes
+
+
+def row_by_row_charge(members, title, amount, due_date):
+    # The old _helper_bulk_transaction loop: one INSERT (and one autocommit) per member
+    count = 0
+    for u in members:
+        Due.objects.create(title=title, amount=amount, due_date=due_date, assigned_to=u)
+        count += 1
+    return count
+
+
+class Command(BaseCommand):
+    help = "Benchmark bulk dues charging: the old per-row loop vs. the set-based bulk_create path. Uses a scratch chapter that is deleted afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000', help="Comma separated chapter sizes.")
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        amount = Decimal('150.00')
+        self.stdout.write(f"{'members':>10}  {'row-by-row (s)':>15}  {'bulk (s)':>10}  {'speedup':>8}")
+
+        for size in parse_sizes(options['sizes']):
+            with scratch_chapter(size) as (chapter, officer):
+                members = chapter.members.all()
+                old_time, old_count = timed(row_by_row_charge, list(members), "Benchmark (old)", amount, today)
+                new_time, summary = timed(bulk_charge_dues, members, "Benchmark (bulk)", amount, today)
+            assert old_count == summary['count'] == size + 1
+            self.stdout.write(f"{size:>10}  {old_time:>15.3f}  {new_time:>10.3f}  {old_time / new_time:>7.1f}x")
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from dashboard.models import HousePoint
+from dashboard.balances import record_point_change
+from dashboard.bulk import bulk_assign_points
+from dashboard.benchmarking import scratch_chapter, timed, parse_sizes
+
+
+def row_by_row_assign(members, approver, chapter, amount, description, date_for):
+    # The old manage_points_creation loop: one INSERT (and one autocommit) per member
+    count = 0
+    for u in members:
+        point = HousePoint.objects.create(
+            user=u, submitted_by=approver, chapter=chapter, amount=amount,
+            description=description, date_for=date_for, status='APPROVED', assigned_approver=approver
+        )
+        record_point_change(point)
+        count += 1
+    return count
+
+
+class Command(BaseCommand):
+    help = "Benchmark bulk point assignment: the old per-row loop vs. the set-based bulk_create path. Uses a scratch chapter that is deleted afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='50,500,5000', help="Comma separated recipient counts.")
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        self.stdout.write(f"{'recipients':>10}  {'row-by-row (s)':>15}  {'bulk (s)':>10}  {'speedup':>8}")
+
+        for size in parse_sizes(options['sizes']):
+            with scratch_chapter(size) as (chapter, officer):
+                members = chapter.members.exclude(pk=officer.pk)
+                old_time, old_count = timed(row_by_row_assign, list(members), officer, chapter, 5, "Benchmark (old)", today)
+                new_time, new_count = timed(
+                    bulk_assign_points, members.values_list('id', flat=True), officer, chapter, 5, "Benchmark (bulk)", today
+                )
+            assert old_count == new_count == size
+            self.stdout.write(f"{size:>10}  {old_time:>15.3f}  {new_time:>10.3f}  {old_time / new_time:>7.1f}x")
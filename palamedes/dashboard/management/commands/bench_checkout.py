@@ -0,0 +1,72 @@
+import secrets
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from dashboard.models import Due
+from dashboard.bulk import bulk_charge_dues
+from dashboard.payments import start_checkout
+from dashboard.payment_providers import FakeProvider, PaymentProviderError, PaymentProviderUnavailable
+from dashboard.benchmarking import scratch_chapter, timed
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Checkout throughput with the in-process FakeProvider: create the session, pay it, apply the webhook. No network. Uses a scratch chapter that is deleted afterwards."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--checkouts', type=int, default=500, help="One member (and one checkout) each.")
+        parser.add_argument('--dues', type=int, default=1, help="Dues per checkout; more than one uses bulk checkout.")
+        parser.add_argument('--latency', type=float, default=0.0, help="Simulated seconds per session created.")
+        parser.add_argument('--jitter', type=float, default=0.0)
+        parser.add_argument('--webhook-latency', type=float, default=0.0)
+        parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of session creations that fail, to exercise the circuit breaker.")
+        parser.add_argument('--reset-timeout', type=float, default=30.0, help="Seconds the circuit breaker stays open.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        provider = FakeProvider(latency=options['latency'], jitter=options['jitter'],
+                                webhook_latency=options['webhook_latency'], error_rate=options['error_rate'],
+                                seed=options['seed'], breaker={'reset_timeout': options['reset_timeout']},
+                                webhook_secret=f"whsec_bench_{secrets.token_hex(16)}")
+        payment_type = 'bulk_payment' if options['dues'] > 1 else 'single'
+        today = timezone.now().date()
+
+        with scratch_chapter(options['checkouts']) as (chapter, officer):
+            members = chapter.members.exclude(pk=officer.pk)
+            for i in range(options['dues']):
+                bulk_charge_dues(members, f"Benchmark dues {i + 1}", Decimal('100.00'), today)
+
+            create_times, complete_times = [], []
+            failed = refused = 0
+            for member in members.order_by('pk'):
+                charges = [(due, due.remaining_balance) for due in Due.objects.filter(assigned_to=member)]
+                try:
+                    seconds, hosted = timed(start_checkout, provider, member, payment_type, charges,
+                                            'http://testserver/success', 'http://testserver/cancel')
+                except PaymentProviderUnavailable:
+                    refused += 1
+                    continue
+                except PaymentProviderError:
+                    failed += 1
+                    continue
+                create_times.append(seconds)
+                seconds, applied = timed(provider.complete_session, hosted.session_id)
+                complete_times.append(seconds)
+                assert applied
+
+            unpaid = Due.objects.filter(assigned_to__chapter=chapter, is_paid=False).count()
+        assert unpaid == (failed + refused) * options['dues']
+
+        total = sum(create_times) + sum(complete_times)
+        self.stdout.write(f"{len(create_times)} checkouts ({payment_type}, {options['dues']} due(s) each) in {total:.3f}s: "
+                          f"{len(create_times) / total:.1f} checkouts/s")
+        if failed or refused:
+            self.stdout.write(f"{failed} failed at the provider, {refused} refused by the open circuit breaker")
+        self.stdout.write(f"{'step':<10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'max (ms)':>10}")
+        for label, samples in (('create', create_times), ('complete', complete_times)):
+            self.stdout.write(f"{label:<10} {percentile(samples, 0.5) * 1000:>10.2f} "
+                              f"{percentile(samples, 0.95) * 1000:>10.2f} {max(samples) * 1000:>10.2f}")
@@ -0,0 +1,88 @@
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from dashboard.models import HousePoint, Due, Task, Announcement
+from dashboard.balances import rebuild_balances
+from dashboard.dues_balances import rebuild_dues_balances
+from dashboard.summary import get_summary, get_announcements, summary_cache_key, announcements_cache_key
+from dashboard.benchmarking import scratch_chapter, timed, BENCH_CHUNK_SIZE
+
+
+def old_dashboard_numbers(user):
+    # What dashboard() used to run on every hit: five separate queries
+    total_points = HousePoint.objects.filter(user=user, status='APPROVED').aggregate(Sum('amount'))['amount__sum'] or 0
+    pending_points = HousePoint.objects.filter(user=user, status='PENDING').aggregate(Sum('amount'))['amount__sum'] or 0
+    dues_balance = Due.objects.filter(assigned_to=user, is_paid=False).aggregate(Sum('amount'))['amount__sum'] or 0
+    pending_tasks_count = Task.objects.filter(assigned_to=user, completed=False).count()
+    announcements = list(Announcement.objects.filter(chapter=user.chapter_id).order_by('-date_posted')[:5])
+    return total_points, pending_points, dues_balance, pending_tasks_count, announcements
+
+
+def new_dashboard_numbers(user):
+    return get_summary(user), get_announcements(user.chapter_id)
+
+
+class Command(BaseCommand):
+    help = "Query counts and latency of the dashboard numbers: old 5-query path vs. the single-query summary (cold and cached)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--history', type=int, default=5000, help="HousePoints / dues rows for the benchmark member.")
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def measure(self, label, func, user, iterations, before=None):
+        with CaptureQueriesContext(connection) as ctx:
+            if before:
+                before()
+            func(user)
+        queries = len(ctx.captured_queries)
+
+        total = 0
+        for _ in range(iterations):
+            if before:
+                before()
+            seconds, _ = timed(func, user)
+            total += seconds
+        self.stdout.write(f"{label:<22} {queries:>8} {total / iterations * 1000:>12.3f}")
+
+    def handle(self, *args, **options):
+        history = options['history']
+        with scratch_chapter(1) as (chapter, officer):
+            member = chapter.members.exclude(pk=officer.pk).get()
+            today = timezone.now().date()
+            statuses = ['APPROVED', 'PENDING', 'REJECTED', 'COUNTERED']
+            HousePoint.objects.bulk_create(
+                [HousePoint(user=member, submitted_by=officer, chapter=chapter, amount=i % 10, description='Bench',
+                            status=statuses[i % 4]) for i in range(history)],
+                batch_size=BENCH_CHUNK_SIZE
+            )
+            Due.objects.bulk_create(
+                [Due(title='Bench', amount=Decimal('25.00'), due_date=today, assigned_to=member, is_paid=bool(i % 2))
+                 for i in range(history)],
+                batch_size=BENCH_CHUNK_SIZE
+            )
+            Task.objects.bulk_create([Task(assigned_to=member, title='Bench', description='', due_date=timezone.now()) for _ in range(20)])
+            Announcement.objects.bulk_create([Announcement(chapter=chapter, author=officer, title='Bench', content='') for _ in range(20)])
+            # bulk_create skips the signals that keep the materialized rows current
+            rebuild_balances(chapter)
+            rebuild_dues_balances(chapter)
+
+            def clear_cache():
+                cache.delete_many([summary_cache_key(member.pk), announcements_cache_key(chapter.pk)])
+
+            # Both paths have to agree before their timings mean anything
+            clear_cache()
+            total_points, pending_points, dues_balance, pending_tasks_count, announcements = old_dashboard_numbers(member)
+            summary, cached_announcements = new_dashboard_numbers(member)
+            assert (total_points, pending_points, dues_balance, pending_tasks_count) == (
+                summary['total_points'], summary['pending_points'], summary['dues_balance'], summary['pending_tasks_count'])
+            assert [a.title for a in announcements] == [a['title'] for a in cached_announcements]
+
+            iterations = options['iterations']
+            self.stdout.write(f"{'path':<22} {'queries':>8} {'avg ms':>12}")
+            self.measure("old (5 queries)", old_dashboard_numbers, member, iterations)
+            self.measure("new, cold cache", new_dashboard_numbers, member, iterations, before=clear_cache)
+            self.measure("new, cached", new_dashboard_numbers, member, iterations)
@@ -0,0 +1,76 @@
+import random
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from users.models import CustomUser
+from dashboard.search import search_members, index_members
+from dashboard.benchmarking import scratch_chapter, timed, parse_sizes, BENCH_CHUNK_SIZE
+
+FIRST_NAMES = ['James', 'John', 'Jonathan', 'Joseph', 'Michael', 'David', 'Daniel', 'Matthew', 'Andrew', 'Ryan',
+               'Christopher', 'Nicholas', 'Tyler', 'Brandon', 'Kevin', 'Jason', 'Justin', 'Eric', 'Adam', 'Aaron',
+               'Luis', 'Carlos', 'Miguel', 'Jose', 'Anthony', 'Kyle', 'Ethan', 'Noah', 'Liam', 'Owen']
+LAST_NAMES = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+              'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+              'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson',
+              'Nguyen', 'Kim', 'Patel', 'OBrien', 'Schmidt', 'Kowalski', 'Chen', 'Wang', 'Singh', 'Murphy']
+MAJORS = ['Computer Science', 'Mechanical Engineering', 'Business Administration', 'Economics', 'Biology',
+          'Political Science', 'Psychology', 'Mathematics', 'Chemistry', 'History', 'Finance', 'Physics']
+HOMETOWNS = ['Los Angeles', 'San Diego', 'Riverside', 'Sacramento', 'San Jose', 'Fresno', 'Irvine', 'Oakland',
+             'Phoenix', 'Seattle', 'Portland', 'Denver', 'Chicago', 'Houston', 'Austin', 'New York']
+
+# What people type, including half-typed words
+QUERIES = ['jo', 'smith', 'jon sm', 'computer', 'san', 'riverside eng', 'kowalski', 'zz']
+
+
+def old_search(members, query):
+    # What directory() used to run: four LIKE '%q%' predicates over every member of the chapter
+    return members.filter(
+        Q(first_name__icontains=query) | Q(last_name__icontains=query) |
+        Q(major__icontains=query) | Q(hometown__icontains=query)
+    )
+
+
+def fetch_page(members):
+    # The directory shows the first screenful; count() is what the "N results" line needs
+    return members.count(), list(members.values_list('pk', flat=True)[:50])
+
+
+class Command(BaseCommand):
+    help = "Directory search latency: the old icontains scan vs. the full-text index, on scratch chapters of the given sizes."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='1000,10000,25000', help="Comma separated chapter sizes.")
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        iterations = options['iterations']
+        self.stdout.write(f"{'members':>8}  {'query':<14} {'matches':>8} {'icontains (ms)':>15} {'indexed (ms)':>13}")
+
+        for size in parse_sizes(options['sizes']):
+            with scratch_chapter(0) as (chapter, officer):
+                members = CustomUser.objects.bulk_create(
+                    [
+                        CustomUser(
+                            username=f"search_{chapter.invite_code.lower()}_{i}", password='!', chapter=chapter,
+                            first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                            major=rng.choice(MAJORS), hometown=rng.choice(HOMETOWNS), status=rng.choice(['NM', 'ACT'])
+                        )
+                        for i in range(size)
+                    ],
+                    batch_size=BENCH_CHUNK_SIZE
+                )
+                # bulk_create skips the post_save receiver that normally keeps the index up to date
+                index_members(chapter.members.values_list('pk', flat=True))
+
+                roster = CustomUser.objects.filter(chapter=chapter).order_by('last_name', 'first_name')
+                for query in QUERIES:
+                    old_count, _ = fetch_page(old_search(roster, query))
+                    new_count, _ = fetch_page(search_members(chapter.id, query).order_by('-search_rank'))
+                    old_time = sum(timed(fetch_page, old_search(roster, query))[0] for _ in range(iterations))
+                    new_time = sum(
+                        timed(fetch_page, search_members(chapter.id, query).order_by('-search_rank'))[0]
+                        for _ in range(iterations)
+                    )
+                    self.stdout.write(f"{size:>8}  {query:<14} {new_count:>8} {old_time / iterations * 1000:>15.2f} "
+                                      f"{new_time / iterations * 1000:>13.2f}   (icontains matched {old_count})")
@@ -0,0 +1,32 @@
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dashboard.recurring import run_recurring_dues
+
+
+class Command(BaseCommand):
+    help = "Bill every member covered by an active recurring dues schedule for the current period. Safe to re-run: members already billed for the period are skipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Bill the period containing this date (YYYY-MM-DD). Defaults to today.")
+        parser.add_argument('--chapter', type=int, help="Limit to a single chapter id.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count who would be billed.")
+
+    def handle(self, *args, **options):
+        as_of = timezone.localdate()
+        if options['date']:
+            try:
+                as_of = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError(f"Invalid date {options['date']!r}, expected YYYY-MM-DD.")
+
+        schedules = 0
+        billed = 0
+        for recurring, count in run_recurring_dues(as_of, chapter_id=options['chapter'], dry_run=options['dry_run']):
+            schedules += 1
+            billed += count
+            if count and options['verbosity'] > 1:
+                self.stdout.write(f"chapter {recurring.chapter_id}: {recurring} -> {count} member(s)")
+
+        verb = "Would bill" if options['dry_run'] else "Billed"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {billed} charge(s) across {schedules} schedule(s) for {as_of}."))
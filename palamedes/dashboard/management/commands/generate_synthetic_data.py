@@ -0,0 +1,54 @@
+import time
+from datetime import date
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from dashboard.synthetic import generate_chapters, parse_member_counts
+
+
+class Command(BaseCommand):
+    help = ("Fill the database with production-sized synthetic chapters: rosters with pledge classes and the default "
+            "positions, years of point requests in every status, dues with partial payments, tasks and announcements. "
+            "The same --seed and options always give the same data.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chapters', type=int, default=3)
+        parser.add_argument('--members', default='150', help="Members per chapter, e.g. 150, or 80-400 for a count drawn per chapter.")
+        parser.add_argument('--nm-ratio', type=float, default=0.25, help="Share of each chapter that is the current new member class.")
+        parser.add_argument('--years', type=int, default=4, help="Years of history.")
+        parser.add_argument('--points', type=int, default=12, help="Average point requests per member per semester.")
+        parser.add_argument('--tasks', type=int, default=3, help="Average tasks per member per semester.")
+        parser.add_argument('--announcements', type=int, default=10, help="Announcements per chapter per semester.")
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--as-of', type=date.fromisoformat, help="Date the history runs up to (default today). Fix it for the same dates on every run.")
+        parser.add_argument('--password', default='palamedes', help="Password of every generated member.")
+
+    def handle(self, *args, **options):
+        try:
+            low, high = parse_member_counts(options['members'])
+        except ValueError:
+            raise CommandError("--members must be a number or a range like 80-400.")
+        if options['chapters'] < 1 or low < 1 or low > high or options['years'] < 1:
+            raise CommandError("--chapters, --members and --years must be at least 1.")
+        if not 0 <= options['nm_ratio'] <= 1:
+            raise CommandError("--nm-ratio must be between 0 and 1.")
+
+        # Hashed once for everybody; hashing per member would take longer than the rest put together
+        password = make_password(options['password'])
+        as_of = options['as_of'] or timezone.localdate()
+        started = time.perf_counter()
+
+        def report(chapter, number, members, counts):
+            self.stdout.write(f"[{number}/{options['chapters']}] {chapter.name} ({chapter.invite_code}): {members} members, "
+                              f"{sum(counts.values()):,} rows so far, {time.perf_counter() - started:.1f}s")
+
+        try:
+            counts = generate_chapters(options, password, as_of, on_chapter=report)
+        except ValueError as e:
+            raise CommandError(f"{e} Use another --seed, or flush the database first.")
+
+        seconds = time.perf_counter() - started
+        for model, count in sorted(counts.items()):
+            self.stdout.write(f"{model:<14} {count:>12,}")
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(f"Inserted {total:,} rows in {seconds:.1f}s ({total / seconds:,.0f} rows/s)."))
@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from dashboard.profile_images import process_batch, requeue_all, WORKER_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Resize queued profile pictures. Runs until the queue is empty, or keeps polling with --loop."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep running and poll for new pictures.")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds between polls with --loop (default 5).")
+        parser.add_argument('--batch', type=int, default=WORKER_BATCH_SIZE, help=f"Pictures claimed at a time (default {WORKER_BATCH_SIZE}).")
+        parser.add_argument('--requeue', action='store_true', help="Queue every member's picture again first, e.g. after adding a size.")
+
+    def handle(self, *args, **options):
+        if options['requeue']:
+            self.stdout.write(f"Queued {requeue_all()} picture(s).")
+
+        done = failed = 0
+        while True:
+            batch_done, batch_failed = process_batch(options['batch'])
+            done += batch_done
+            failed += batch_failed
+            if batch_failed and options['verbosity'] > 1:
+                self.stdout.write(self.style.WARNING(f"{batch_failed} picture(s) could not be processed."))
+            if batch_done or batch_failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} picture(s), {failed} failed."))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from users.models import Chapter
+from dashboard.search import rebuild_member_search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the directory search index from the member table (e.g. after members were bulk imported)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chapter', type=int, help="Limit to a single chapter id.")
+
+    def handle(self, *args, **options):
+        chapter_id = options['chapter']
+        if chapter_id and not Chapter.objects.filter(pk=chapter_id).exists():
+            raise CommandError(f"Chapter {chapter_id} does not exist.")
+
+        with transaction.atomic():
+            count = rebuild_member_search(chapter_id)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} members for search."))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from users.models import Chapter
+from dashboard.balances import find_balance_mismatches, rebuild_balances
+
+
+class Command(BaseCommand):
+    help = "Rebuild (or just verify) the materialized point balances from the raw HousePoint ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verify', action='store_true', help="Only compare stored balances to the ledger. Exits with an error on drift.")
+        parser.add_argument('--chapter', type=int, help="Limit to a single chapter id.")
+
+    def handle(self, *args, **options):
+        chapter = None
+        if options['chapter']:
+            try:
+                chapter = Chapter.objects.get(pk=options['chapter'])
+            except Chapter.DoesNotExist:
+                raise CommandError(f"Chapter {options['chapter']} does not exist.")
+
+        if options['verify']:
+            mismatches = find_balance_mismatches(chapter)
+            for kind, pk, stored, expected in mismatches:
+                self.stdout.write(f"{kind} {pk}: stored {stored} != ledger {expected}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} balance(s) out of sync with the ledger.")
+            self.stdout.write(self.style.SUCCESS("All point balances match the ledger."))
+            return
+
+        with transaction.atomic():
+            members, chapters = rebuild_balances(chapter)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt point balances for {members} members and {chapters} chapters."))
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from dashboard.models import CheckoutSession
+from dashboard.fake_stripe import checkout_session_object, build_event, send_event
+from dashboard.payments import RECONCILE_EVENTS
+
+
+class Command(BaseCommand):
+    help = "Send a signed, Stripe-style checkout webhook for a local checkout session to a running dev server."
+
+    def add_arguments(self, parser):
+        parser.add_argument('session_id', help="CheckoutSession.session_id to complete.")
+        parser.add_argument('--url', default='http://127.0.0.1:8000/dashboard/dues/stripe/webhook/')
+        parser.add_argument('--type', default=RECONCILE_EVENTS[0], help="Event type to send.")
+        parser.add_argument('--amount', type=int, help="amount_total in cents (defaults to the recorded amount).")
+        parser.add_argument('--unpaid', action='store_true', help="Send payment_status='unpaid' (delayed payment methods).")
+        parser.add_argument('--repeat', type=int, default=1, help="Deliver the same event this many times.")
+
+    def handle(self, *args, **options):
+        if not settings.STRIPE_WEBHOOK_SECRET:
+            raise CommandError("STRIPE_WEBHOOK_SECRET is not set; the webhook would reject the event.")
+        try:
+            checkout = CheckoutSession.objects.get(session_id=options['session_id'])
+        except CheckoutSession.DoesNotExist:
+            raise CommandError(f"No checkout session {options['session_id']}.")
+
+        session = checkout_session_object(
+            checkout,
+            payment_status='unpaid' if options['unpaid'] else 'paid',
+            amount_total=options['amount']
+        )
+        # Redelivery reuses the event, like Stripe's retries do
+        event = build_event(options['type'], session)
+        for _ in range(options['repeat']):
+            status = send_event(event, options['url'], settings.STRIPE_WEBHOOK_SECRET)
+            self.stdout.write(f"{event['id']} -> HTTP {status}")
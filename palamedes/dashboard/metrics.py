@@ -0,0 +1,102 @@
+# dashboard/metrics.py
+# In-process metrics in the Prometheus text format, served by the protected /metrics view.
+# Every worker process keeps its own numbers (Prometheus scrapes and sums them per instance), so
+# there's no shared storage to keep in sync. Updates take a lock; they're a few dict operations.
+import threading
+from bisect import bisect_left
+
+# Seconds. Covers fast cache hits up to requests that are about to time out.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REGISTRY = []
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    pairs = ','.join('{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                     for k, v in labels)
+    return '{' + pairs + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help_text, registry=REGISTRY):
+        self.name = name
+        self.help_text = help_text
+        self.lock = threading.Lock()
+        self.series = {}
+        registry.append(self)
+
+    def _key(self, labels):
+        return tuple(sorted(labels.items()))
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+        with self.lock:
+            series = sorted(self.series.items())
+            lines.extend(self._render_series(key, value) for key, value in series)
+        return '\n'.join(line for line in lines if line)
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def _render_series(self, key, value):
+        return f'{self.name}{_label_text(key)} {_number(value)}'
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.series[self._key(labels)] = value
+
+    def _render_series(self, key, value):
+        return f'{self.name}{_label_text(key)} {_number(value)}'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help_text, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.series.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            # Stored per bucket, made cumulative when rendered
+            counts[bisect_left(self.buckets, value)] += 1
+            self.series[key] = (counts, total + value)
+
+    def _render_series(self, key, value):
+        counts, total = value
+        lines = []
+        running = 0
+        for bound, count in zip(self.buckets + ('+Inf',), counts):
+            running += count
+            lines.append(f'{self.name}_bucket{_label_text(key + (("le", _number(bound)),))} {running}')
+        lines.append(f'{self.name}_sum{_label_text(key)} {total!r}')
+        lines.append(f'{self.name}_count{_label_text(key)} {running}')
+        return '\n'.join(lines)
+
+
+def render_metrics(registry=REGISTRY):
+    return '\n'.join(metric.render() for metric in registry) + '\n'
@@ -0,0 +1,107 @@
+# dashboard/middleware.py
+# RequestMetricsMiddleware: how long each view takes and how many SQL queries it runs, served on /metrics.
+# Requests are labelled by URL name, never by path, so a member's profile page is one series however
+# many members there are.
+# Queries are counted by count_queries, an execute_wrapper that signals.py puts on every database
+# connection as it opens. It adds to the counter of the request being served, found through a context
+# variable: under asgi.py sync views run on another thread with their own connection, but they inherit
+# the request's context. Outside a request it only looks the variable up. Two perf_counter() calls per
+# query and three histogram updates per request, cheap enough to leave on. Queries slower than
+# SLOW_QUERY_MS are handed to slow_queries.py.
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from .metrics import Histogram
+from .slow_queries import note_slow_query, slow_query_threshold
+
+# Queries per request. A view in the upper buckets is probably running one query per row.
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SQL_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', "Time spent in the view and middleware, by URL name, method and status class.")
+REQUEST_QUERIES = Histogram('http_request_sql_queries', "SQL queries run per request, by URL name.", buckets=QUERY_BUCKETS)
+REQUEST_SQL_TIME = Histogram('http_request_sql_seconds', "Time spent in SQL per request, by URL name.", buckets=SQL_BUCKETS)
+
+_request_queries = ContextVar('request_queries', default=None)
+
+
+class QueryCounter:
+    def __init__(self, request):
+        self.request = request
+        self.count = 0
+        self.seconds = 0.0
+        self.slow_after = slow_query_threshold()
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _request_queries.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        counter.seconds += elapsed
+        counter.count += 1
+        if elapsed >= counter.slow_after:
+            # Not counted: the EXPLAIN it may run
+            token = _request_queries.set(None)
+            try:
+                note_slow_query(view_label(counter.request), sql, params, elapsed, context['connection'], many)
+            finally:
+                _request_queries.reset(token)
+
+
+def install_query_counter(connection):
+    # Called on every new connection; the same wrapper object survives reconnects, so only add it once
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, count_queries)
+
+
+def view_label(request):
+    match = getattr(request, 'resolver_match', None)
+    # 404s and anything else that never reached a view share one series
+    return match.view_name if match and match.view_name else 'unmatched'
+
+
+def record_request(request, response, started, counter):
+    view = view_label(request)
+    REQUEST_LATENCY.observe(time.perf_counter() - started, view=view, method=request.method,
+                            status=f'{response.status_code // 100}xx')
+    REQUEST_QUERIES.observe(counter.count, view=view)
+    REQUEST_SQL_TIME.observe(counter.seconds, view=view)
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        counter = QueryCounter(request)
+        token = _request_queries.set(counter)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        record_request(request, response, started, counter)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        counter = QueryCounter(request)
+        token = _request_queries.set(counter)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        record_request(request, response, started, counter)
+        return response
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def backfill_balances(apps, schema_editor):
+    HousePoint = apps.get_model('dashboard', 'HousePoint')
+    PointBalance = apps.get_model('dashboard', 'PointBalance')
+    ChapterPointBalance = apps.get_model('dashboard', 'ChapterPointBalance')
+
+    aggregates = dict(
+        approved_total=Sum('amount', filter=Q(status='APPROVED'), default=0),
+        approved_count=Count('id', filter=Q(status='APPROVED')),
+        pending_total=Sum('amount', filter=Q(status='PENDING'), default=0),
+        pending_count=Count('id', filter=Q(status='PENDING')),
+    )
+    PointBalance.objects.bulk_create(
+        [PointBalance(**row) for row in HousePoint.objects.values('user_id').annotate(**aggregates)],
+        batch_size=500,
+    )
+    ChapterPointBalance.objects.bulk_create(
+        [ChapterPointBalance(**row) for row in HousePoint.objects.filter(chapter__isnull=False).values('chapter_id').annotate(**aggregates)],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0002_initial'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterPointBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approved_total', models.IntegerField(default=0)),
+                ('approved_count', models.IntegerField(default=0)),
+                ('pending_total', models.IntegerField(default=0)),
+                ('pending_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chapter', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='point_balance', to='users.chapter')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PointBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('approved_total', models.IntegerField(default=0)),
+                ('approved_count', models.IntegerField(default=0)),
+                ('pending_total', models.IntegerField(default=0)),
+                ('pending_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='point_balance', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
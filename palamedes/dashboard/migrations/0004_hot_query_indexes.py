@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_chapterpointbalance_pointbalance'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='due',
+            index=models.Index(fields=['assigned_to', 'is_paid', 'due_date'], name='due_assignee_paid_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='housepoint',
+            index=models.Index(fields=['chapter', 'status', 'assigned_approver'], name='hp_chapter_status_appr_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='housepoint',
+            index=models.Index(fields=['user', 'status'], name='hp_user_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='housepoint',
+            index=models.Index(fields=['submitted_by', 'status'], name='hp_submitter_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='housepoint',
+            index=models.Index(fields=['chapter', 'date_submitted'], name='hp_chapter_submitted_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='housepoint',
+            index=models.Index(fields=['chapter', 'amount'], name='hp_chapter_amount_idx'),
+        ),
+    ]
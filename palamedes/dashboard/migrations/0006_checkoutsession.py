@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0005_housepoint_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckoutSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.CharField(max_length=255, unique=True)),
+                ('payment_type', models.CharField(choices=[('single', 'Single Due'), ('bulk_payment', 'Multiple Dues')], max_length=20)),
+                ('amount_total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('OPEN', 'Awaiting Payment'), ('COMPLETED', 'Completed')], default='OPEN', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('completed_at', models.DateTimeField(blank=True, null=True)),
+                ('dues', models.ManyToManyField(related_name='checkout_sessions', to='dashboard.due')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkout_sessions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
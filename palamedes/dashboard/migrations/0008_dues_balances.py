@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, Min, Sum
+
+
+def backfill_balances(apps, schema_editor):
+    Due = apps.get_model('dashboard', 'Due')
+    DuesBalance = apps.get_model('dashboard', 'DuesBalance')
+    ChapterDuesBalance = apps.get_model('dashboard', 'ChapterDuesBalance')
+
+    open_dues = Due.objects.filter(is_paid=False, assigned_to__isnull=False)
+    aggregates = dict(
+        outstanding_total=Sum(F('amount') - F('amount_paid')),
+        open_count=Count('id'),
+        oldest_due_date=Min('due_date'),
+    )
+    DuesBalance.objects.bulk_create(
+        [DuesBalance(user_id=row.pop('assigned_to_id'), **row) for row in open_dues.values('assigned_to_id').annotate(**aggregates)],
+        batch_size=500,
+    )
+    ChapterDuesBalance.objects.bulk_create(
+        [
+            ChapterDuesBalance(chapter_id=row.pop('assigned_to__chapter_id'), **row)
+            for row in open_dues.filter(assigned_to__chapter__isnull=False).values('assigned_to__chapter_id')
+            .annotate(members_owing=Count('assigned_to_id', distinct=True), **aggregates)
+        ],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0007_payment_ledger'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChapterDuesBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outstanding_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('open_count', models.IntegerField(default=0)),
+                ('members_owing', models.IntegerField(default=0)),
+                ('oldest_due_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('chapter', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='outstanding_dues', to='users.chapter')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DuesBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outstanding_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('open_count', models.IntegerField(default=0)),
+                ('oldest_due_date', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='outstanding_dues', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
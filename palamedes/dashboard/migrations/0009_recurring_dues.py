@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_dues_balances'),
+        ('users', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringDue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('schedule', models.CharField(choices=[('MONTHLY', 'Monthly'), ('SEMESTER', 'Every Semester'), ('YEARLY', 'Yearly')], max_length=20)),
+                ('segment', models.CharField(choices=[('ALL', 'Everyone in Chapter'), ('ACTIVES', 'All Actives'), ('NMS', 'All New Members'), ('PLEDGE_CLASS', 'Specific Pledge Class')], default='ALL', max_length=20)),
+                ('pledge_semester', models.CharField(blank=True, choices=[('Fall', 'Fall'), ('Spring', 'Spring')], max_length=10)),
+                ('pledge_year', models.IntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('ends_on', models.DateField(blank=True, help_text='Leave blank to keep billing indefinitely.', null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='due',
+            name='period',
+            field=models.CharField(blank=True, help_text='e.g. 2025-FA, 2025-09', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='due',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='generated_dues', to='dashboard.due'),
+        ),
+        migrations.AddConstraint(
+            model_name='due',
+            constraint=models.UniqueConstraint(condition=models.Q(('template__isnull', False)), fields=('template', 'period', 'assigned_to'), name='due_template_period_member_uniq'),
+        ),
+        migrations.AddField(
+            model_name='recurringdue',
+            name='chapter',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recurring_dues', to='users.chapter'),
+        ),
+        migrations.AddField(
+            model_name='recurringdue',
+            name='template',
+            field=models.OneToOneField(limit_choices_to={'is_template': True}, on_delete=django.db.models.deletion.CASCADE, related_name='recurrence', to='dashboard.due'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+# The schema and backfill are spelled out here rather than imported from dashboard/search.py, so later
+# changes to that module can't change what this migration does.
+SQLITE_SCHEMA = [
+    # chapter_key ("c<chapter id>") is indexed too, so a search only ever walks one chapter's postings.
+    # prefix='2 3' keeps extra indexes for 2 and 3 letter prefixes, the slow case while typing.
+    "CREATE VIRTUAL TABLE dashboard_membersearch USING fts5("
+    "chapter_key, first_name, last_name, major, hometown, tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "INSERT INTO dashboard_membersearch (rowid, chapter_key, first_name, last_name, major, hometown) "
+    "SELECT id, 'c' || chapter_id, first_name, last_name, major, hometown FROM users_customuser",
+]
+
+POSTGRES_SCHEMA = [
+    "CREATE TABLE dashboard_membersearch (rowid bigint PRIMARY KEY, chapter_id bigint, document tsvector NOT NULL)",
+    "CREATE INDEX dashboard_membersearch_document_idx ON dashboard_membersearch USING GIN (document)",
+    "INSERT INTO dashboard_membersearch (rowid, chapter_id, document) "
+    "SELECT id, chapter_id, "
+    "setweight(to_tsvector('simple', coalesce(first_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(last_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(major, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(hometown, '')), 'C') "
+    "FROM users_customuser",
+]
+
+
+def create_index(apps, schema_editor):
+    statements = POSTGRES_SCHEMA if schema_editor.connection.vendor == 'postgresql' else SQLITE_SCHEMA
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    schema_editor.execute('DROP TABLE IF EXISTS dashboard_membersearch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0009_recurring_dues'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSearch',
+            fields=[
+                ('user', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'dashboard_membersearch',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:14
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def queue_existing(apps, schema_editor):
+    # Everyone's current picture goes into the queue for the process_profile_images worker
+    CustomUser = apps.get_model('users', 'CustomUser')
+    ProfileImage = apps.get_model('dashboard', 'ProfileImage')
+    ProfileImage.objects.bulk_create(
+        [ProfileImage(user_id=pk, source=image or '') for pk, image in CustomUser.objects.values_list('pk', 'image').iterator()],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0010_member_search'),
+        ('users', '0002_customuser_image_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfileImage',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile_image', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('source', models.CharField(max_length=255)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(choices=[('PENDING', 'Waiting'), ('PROCESSING', 'Processing'), ('READY', 'Ready'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'updated_at'], name='profileimage_queue_idx')],
+            },
+        ),
+        migrations.RunPython(queue_existing, migrations.RunPython.noop),
+    ]
@@ -35,9 +35,78 @@ class HousePoint(models.Model):
     
     updated_at = models.DateTimeField(auto_now=True)
 
+    # Bumped on every negotiation step so two people acting on the same request can't overwrite each other
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # Inbox / exec queue: chapter + status + who has to act on it
+            models.Index(fields=['chapter', 'status', 'assigned_approver'], name='hp_chapter_status_appr_idx'),
+            # Per-member totals and "my requests"
+            models.Index(fields=['user', 'status'], name='hp_user_status_idx'),
+            models.Index(fields=['submitted_by', 'status'], name='hp_submitter_status_idx'),
+            # Points hub logs, sorted by date or amount
+            models.Index(fields=['chapter', 'date_submitted'], name='hp_chapter_submitted_idx'),
+            models.Index(fields=['chapter', 'amount'], name='hp_chapter_amount_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user.username} - {self.amount} - {self.get_status_display()}"
 
+# Running totals kept in step with HousePoint so pages don't have to Sum() the whole ledger.
+# Rebuild with: python manage.py rebuild_point_balances
+class PointBalance(models.Model):
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='point_balance')
+
+    approved_total = models.IntegerField(default=0)
+    approved_count = models.IntegerField(default=0)
+    pending_total = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - {self.approved_total} pts"
+
+class ChapterPointBalance(models.Model):
+    chapter = models.OneToOneField(Chapter, on_delete=models.CASCADE, related_name='point_balance')
+
+    approved_total = models.IntegerField(default=0)
+    approved_count = models.IntegerField(default=0)
+    pending_total = models.IntegerField(default=0)
+    pending_count = models.IntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.chapter.name} - {self.approved_total} pts"
+
+class DuesBalance(models.Model):
+    # What a member still owes, kept in step with Due/Payment by dues_balances.refresh_dues_balances
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='outstanding_dues')
+
+    outstanding_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    open_count = models.IntegerField(default=0)
+    oldest_due_date = models.DateField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user.username} - ${self.outstanding_total} owed"
+
+class ChapterDuesBalance(models.Model):
+    chapter = models.OneToOneField(Chapter, on_delete=models.CASCADE, related_name='outstanding_dues')
+
+    outstanding_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    open_count = models.IntegerField(default=0)
+    members_owing = models.IntegerField(default=0)
+    oldest_due_date = models.DateField(null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.chapter.name} - ${self.outstanding_total} owed"
+
 class Due(models.Model):
     title = models.CharField(max_length=100) # e.g. "Fall 2025 Dues"
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -47,10 +116,111 @@ class Due(models.Model):
     # If linked to a specific user (an individual bill)
     assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True, related_name='dues')
     is_paid = models.BooleanField(default=False)
+    # Running total of this due's Payment rows, kept in step with the ledger so balances don't need a join
+    amount_paid = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    # Set on charges generated from a recurring template: which template, and for which billing period
+    template = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='generated_dues')
+    period = models.CharField(max_length=10, blank=True, help_text="e.g. 2025-FA, 2025-09")
+
+    class Meta:
+        indexes = [
+            # "My unpaid dues, oldest first"
+            models.Index(fields=['assigned_to', 'is_paid', 'due_date'], name='due_assignee_paid_date_idx'),
+        ]
+        constraints = [
+            # Re-running the recurring charges for a period can never bill a member twice
+            models.UniqueConstraint(
+                fields=['template', 'period', 'assigned_to'],
+                condition=models.Q(template__isnull=False),
+                name='due_template_period_member_uniq'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.title} - ${self.amount}"
 
+    @property
+    def remaining_balance(self):
+        return self.amount - self.amount_paid
+
+class RecurringDue(models.Model):
+    # Schedule for a template Due (is_template=True): the title and amount come from the template,
+    # and generate_recurring_dues bills every member of the segment once per period.
+    SCHEDULE_CHOICES = [
+        ('MONTHLY', 'Monthly'),
+        ('SEMESTER', 'Every Semester'),
+        ('YEARLY', 'Yearly'),
+    ]
+    SEGMENT_CHOICES = [
+        ('ALL', 'Everyone in Chapter'),
+        ('ACTIVES', 'All Actives'),
+        ('NMS', 'All New Members'),
+        ('PLEDGE_CLASS', 'Specific Pledge Class'),
+    ]
+
+    chapter = models.ForeignKey(Chapter, on_delete=models.CASCADE, related_name='recurring_dues')
+    template = models.OneToOneField(Due, on_delete=models.CASCADE, related_name='recurrence', limit_choices_to={'is_template': True})
+    schedule = models.CharField(max_length=20, choices=SCHEDULE_CHOICES)
+    # The template's due_date is the first period's due date; later periods keep the same offset
+    segment = models.CharField(max_length=20, choices=SEGMENT_CHOICES, default='ALL')
+    pledge_semester = models.CharField(max_length=10, choices=[('Fall', 'Fall'), ('Spring', 'Spring')], blank=True)
+    pledge_year = models.IntegerField(blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+    ends_on = models.DateField(null=True, blank=True, help_text="Leave blank to keep billing indefinitely.")
+
+    def __str__(self):
+        return f"{self.template.title} ({self.get_schedule_display()})"
+
+class CheckoutSession(models.Model):
+    # One row per Stripe Checkout session we create. The Stripe webhook marks it COMPLETED and applies the
+    # payment to the dues; payment_success only ever reads this row.
+    STATUS_CHOICES = [
+        ('OPEN', 'Awaiting Payment'),
+        ('COMPLETED', 'Completed'),
+    ]
+    PAYMENT_TYPES = [
+        ('single', 'Single Due'),
+        ('bulk_payment', 'Multiple Dues'),
+    ]
+
+    session_id = models.CharField(max_length=255, unique=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='checkout_sessions')
+    payment_type = models.CharField(max_length=20, choices=PAYMENT_TYPES)
+    dues = models.ManyToManyField(Due, related_name='checkout_sessions')
+    # What we asked Stripe to charge; replaced by what Stripe actually collected once the session completes
+    amount_total = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='OPEN')
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.session_id} ({self.status})"
+
+class Payment(models.Model):
+    # Append-only ledger of money received against a due. Rows are never edited; a due's outstanding
+    # balance is amount - the sum of its payments (cached on Due.amount_paid).
+    METHOD_CHOICES = [
+        ('STRIPE', 'Stripe Checkout'),
+        ('MANUAL', 'Recorded by Treasurer'),
+    ]
+
+    due = models.ForeignKey(Due, on_delete=models.CASCADE, related_name='payments')
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    method = models.CharField(max_length=20, choices=METHOD_CHOICES)
+    # Stripe Checkout session id. A bulk checkout pays several dues, so it's unique per due.
+    provider_session_id = models.CharField(max_length=255, null=True, blank=True)
+    recorded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='payments_recorded')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # A redelivered webhook can never apply the same session to a due twice
+            models.UniqueConstraint(fields=['provider_session_id', 'due'], name='payment_session_due_uniq'),
+        ]
+
+    def __str__(self):
+        return f"${self.amount} toward {self.due.title}"
+
 class Task(models.Model):
     assigned_to = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tasks')
     assigned_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='created_tasks')
@@ -70,4 +240,42 @@ class Announcement(models.Model):
     date_posted = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.title} - {self.chapter.name}"
\ No newline at end of file
+        return f"{self.title} - {self.chapter.name}"
+
+class MemberSearch(models.Model):
+    # Row of the directory search index (see dashboard/search.py). The table is an FTS5 virtual table on
+    # SQLite and a tsvector table on Postgres, so it's created by hand in migration 0010 and only used
+    # here to join members to their index entry.
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, primary_key=True,
+                                db_column='rowid', db_constraint=False, related_name='search_entry')
+
+    class Meta:
+        managed = False
+        db_table = 'dashboard_membersearch'
+
+class ProfileImage(models.Model):
+    # Queue for the background profile picture resizing (see dashboard/profile_images.py), one row per member
+    STATUS_CHOICES = [
+        ('PENDING', 'Waiting'),
+        ('PROCESSING', 'Processing'),
+        ('READY', 'Ready'),
+        ('FAILED', 'Failed'),
+    ]
+
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='profile_image')
+    # The image.name this row is about; a new upload gets a new name
+    source = models.CharField(max_length=255)
+    content_hash = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.CharField(max_length=255, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # The worker's "oldest waiting first"
+            models.Index(fields=['status', 'updated_at'], name='profileimage_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} ({self.status})"
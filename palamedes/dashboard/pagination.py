@@ -0,0 +1,57 @@
+# dashboard/pagination.py
+# Keyset ("seek") pagination for the points hub logs.
+# Instead of OFFSET we remember the sort value + id of the last row shown and ask for rows after it,
+# so page 200 costs the same index seek as page 1.
+from datetime import datetime
+from django.core import signing
+from django.db.models import Q
+
+LOG_SORTS = ['amount', '-amount', 'date_submitted', '-date_submitted']
+LOG_PAGE_SIZE = 50
+
+CURSOR_SALT = 'dashboard.pagination.cursor'
+
+
+def encode_cursor(sort, obj):
+    value = getattr(obj, sort.lstrip('-'))
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    # Signed + url-safe base64, so it can go straight into a query string and can't be forged
+    return signing.dumps([sort, value, obj.pk], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token, sort):
+    # Returns (value, pk), or None if the token is bad or belongs to a different sort
+    try:
+        cursor_sort, value, pk = signing.loads(token, salt=CURSOR_SALT)
+        if cursor_sort != sort:
+            return None
+        if sort.lstrip('-') == 'date_submitted':
+            value = datetime.fromisoformat(value)
+        return value, int(pk)
+    except (signing.BadSignature, ValueError, TypeError):
+        return None
+
+
+def keyset_page(queryset, sort, token=None, page_size=LOG_PAGE_SIZE):
+    # Returns (rows, next_cursor). next_cursor is None on the last page.
+    field = sort.lstrip('-')
+    descending = sort.startswith('-')
+    op = 'lt' if descending else 'gt'
+
+    # id breaks ties so rows with the same amount/date are never skipped or repeated
+    queryset = queryset.order_by(sort, '-pk' if descending else 'pk')
+
+    cursor = decode_cursor(token, sort) if token else None
+    if cursor:
+        value, pk = cursor
+        # The plain range condition is what lets the (chapter, <field>) index seek straight to the page;
+        # the OR only has to sort out ties on the boundary value.
+        queryset = queryset.filter(
+            Q(**{f'{field}__{op}e': value}),
+            Q(**{f'{field}__{op}': value}) | Q(**{f'pk__{op}': pk})
+        )
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(sort, rows[page_size - 1]) if len(rows) > page_size else None
+    return rows[:page_size], next_cursor
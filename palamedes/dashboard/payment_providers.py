@@ -0,0 +1,244 @@
+# dashboard/payment_providers.py
+# Everything that talks to the payment processor goes through a provider picked by
+# settings.PAYMENT_PROVIDER, instead of the global stripe module.
+# StripeProvider is the real thing. FakeProvider never leaves the process: it hands out deterministic
+# session ids, sleeps to stand in for Stripe's API latency, and "completes" a checkout by signing and
+# delivering the same webhook Stripe would, so the whole checkout path can be load tested offline.
+# Calls out to the provider go through a circuit breaker and are timed into the metrics registry.
+import hashlib
+import hmac
+import itertools
+import json
+import logging
+import random
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import namedtuple
+from functools import lru_cache
+import stripe
+from django.conf import settings
+from django.core import mail
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from .models import CheckoutSession
+from .payments import handle_webhook_event
+from .fake_stripe import checkout_session_object, build_event, encode_event, sign_payload, post_payload
+from .circuit_breaker import CircuitBreaker, CircuitOpen
+from .metrics import Histogram, Gauge, Counter
+
+logger = logging.getLogger(__name__)
+
+# What the member is redirected to after a session is created
+HostedCheckout = namedtuple('HostedCheckout', ['session_id', 'url'])
+
+
+BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+PROVIDER_LATENCY = Histogram('payment_provider_request_seconds', "Calls to the payment provider by operation and outcome (ok, error, rejected).")
+BREAKER_STATE = Gauge('payment_provider_circuit_state', "Payment provider circuit breaker: 0 closed, 1 half open, 2 open.")
+BREAKER_TRANSITIONS = Counter('payment_provider_circuit_transitions_total', "Payment provider circuit breaker state changes.")
+
+
+class WebhookError(Exception):
+    # The delivery isn't JSON or its signature doesn't check out
+    pass
+
+
+class PaymentProviderError(Exception):
+    # The provider couldn't be reached, timed out, or had an error of its own (not a problem with our request)
+    pass
+
+
+class PaymentProviderUnavailable(PaymentProviderError):
+    # The circuit breaker is open: the call wasn't even attempted
+    pass
+
+
+class PaymentRequestError(Exception):
+    # The provider refused the request itself (invalid parameters, a reused idempotency key). Not an
+    # outage, so it doesn't count against the circuit breaker; the provider's message is only logged.
+    pass
+
+
+class PaymentProvider(ABC):
+    name = 'provider'
+    webhook_secret = ''
+
+    def __init__(self, breaker=None):
+        # breaker: CircuitBreaker options (window, min_calls, failure_rate, reset_timeout)
+        self.breaker = CircuitBreaker(on_change=self._breaker_changed, **(breaker or {}))
+        BREAKER_STATE.set(0, provider=self.name)
+
+    def _breaker_changed(self, state):
+        BREAKER_STATE.set(BREAKER_STATES[state], provider=self.name)
+        BREAKER_TRANSITIONS.inc(provider=self.name, state=state)
+
+    def _call(self, operation, func, *args, **kwargs):
+        start = time.perf_counter()
+        outcome = 'error'
+        try:
+            result = self.breaker.call(func, *args, failure_exceptions=(PaymentProviderError,), **kwargs)
+            outcome = 'ok'
+            return result
+        except CircuitOpen:
+            outcome = 'rejected'
+            raise PaymentProviderUnavailable(f"{self.name} is unavailable, try again shortly") from None
+        finally:
+            PROVIDER_LATENCY.observe(time.perf_counter() - start, provider=self.name, operation=operation, outcome=outcome)
+
+    def create_checkout_session(self, line_items, metadata, success_url, cancel_url, idempotency_key=None):
+        # line_items are (name, amount in cents) pairs. Returns a HostedCheckout.
+        # The same idempotency_key gets the same session back instead of a new one.
+        return self._call('create_checkout_session', self._create_checkout_session,
+                          line_items, metadata, success_url, cancel_url, idempotency_key)
+
+    @abstractmethod
+    def _create_checkout_session(self, line_items, metadata, success_url, cancel_url, idempotency_key):
+        pass
+
+    @abstractmethod
+    def construct_event(self, payload, signature):
+        # Verifies a webhook delivery and returns the event as a plain dict, or raises WebhookError
+        pass
+
+
+class StripeProvider(PaymentProvider):
+    # One client per process. Its requests sessions keep connections to Stripe alive (one pool per
+    # thread), and the timeouts bound how long a worker can be stuck on a slow Stripe: with the defaults,
+    # at most (2 + 6) seconds per attempt, two attempts, plus Stripe's short backoff in between.
+    name = 'stripe'
+
+    def __init__(self, api_key=None, webhook_secret=None, connect_timeout=2, read_timeout=6, max_retries=1, breaker=None):
+        super().__init__(breaker)
+        self.client = stripe.StripeClient(
+            api_key or settings.STRIPE_SECRET_KEY,
+            http_client=stripe.RequestsClient(timeout=(connect_timeout, read_timeout)),
+            max_network_retries=max_retries,
+        )
+        self.webhook_secret = webhook_secret or settings.STRIPE_WEBHOOK_SECRET
+
+    def _create_checkout_session(self, line_items, metadata, success_url, cancel_url, idempotency_key):
+        options = {'idempotency_key': idempotency_key} if idempotency_key else {}
+        try:
+            session = self._send_checkout_session(line_items, metadata, success_url, cancel_url, options)
+        except (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError) as e:
+            raise PaymentProviderError(str(e)) from e
+        except stripe.StripeError as e:
+            # IdempotencyError, InvalidRequestError, AuthenticationError, ...
+            logger.warning("Stripe refused a checkout session: %s", e)
+            raise PaymentRequestError(type(e).__name__) from e
+        return HostedCheckout(session.id, session.url)
+
+    def _send_checkout_session(self, line_items, metadata, success_url, cancel_url, options):
+        return self.client.v1.checkout.sessions.create(params={
+            'line_items': [
+                {
+                    'price_data': {
+                        'currency': 'usd',
+                        'product_data': {'name': name},
+                        'unit_amount': cents,
+                    },
+                    'quantity': 1,
+                }
+                for name, cents in line_items
+            ],
+            'mode': 'payment',
+            'metadata': metadata,
+            'success_url': success_url,
+            'cancel_url': cancel_url,
+        }, options=options)
+
+    def construct_event(self, payload, signature):
+        try:
+            event = self.client.construct_event(payload, signature, self.webhook_secret)
+        except (ValueError, stripe.SignatureVerificationError) as e:
+            raise WebhookError(str(e))
+        return event.to_dict()
+
+
+class FakeProvider(PaymentProvider):
+    # Options (settings.PAYMENT_PROVIDER['OPTIONS']):
+    #   latency / jitter    seconds to sleep per session created: latency plus up to jitter more
+    #   webhook_latency     seconds between "paying" and the webhook arriving
+    #   error_rate          fraction of session creations that fail like an unreachable Stripe would
+    #   seed                makes session ids, jitter and errors reproducible (otherwise ids are random per process)
+    #   webhook_url         POST webhooks to a running server instead of handling them in-process
+    #   webhook_secret      signs the webhooks (defaults to STRIPE_WEBHOOK_SECRET; one of the two is required)
+    #   breaker             circuit breaker options, as for StripeProvider
+    name = 'fake'
+
+    def __init__(self, latency=0.0, jitter=0.0, webhook_latency=0.0, error_rate=0.0, seed=None, webhook_secret=None,
+                 webhook_url=None, breaker=None):
+        # The fake checkout page marks dues paid for anyone who clicks through it, so it never runs in
+        # production. The test runner turns DEBUG off, but it's recognisable by the mail outbox it installs.
+        if not (settings.DEBUG or hasattr(mail, 'outbox')):
+            raise ImproperlyConfigured("FakeProvider is only for development and tests (DEBUG is off)")
+        webhook_secret = webhook_secret or settings.STRIPE_WEBHOOK_SECRET
+        if not webhook_secret:
+            raise ImproperlyConfigured("FakeProvider needs a webhook secret: set STRIPE_WEBHOOK_SECRET or OPTIONS['webhook_secret']")
+        super().__init__(breaker)
+        self.latency = latency
+        self.jitter = jitter
+        self.webhook_latency = webhook_latency
+        self.error_rate = error_rate
+        self.webhook_secret = webhook_secret
+        self.webhook_url = webhook_url
+        self.random = random.Random(seed)
+        self.prefix = f'cs_fake_{seed}_' if seed is not None else f'cs_fake_{uuid.uuid4().hex[:12]}_'
+        self.counter = itertools.count(1)
+
+    def _wait(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _create_checkout_session(self, line_items, metadata, success_url, cancel_url, idempotency_key):
+        self._wait(self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0))
+        if self.error_rate and self.random.random() < self.error_rate:
+            raise PaymentProviderError("Simulated connection error")
+        if idempotency_key:
+            # Same key, same session, in every process
+            session_id = 'cs_fake_' + hashlib.sha256(idempotency_key.encode('utf-8')).hexdigest()[:24]
+        else:
+            session_id = f'{self.prefix}{next(self.counter):08d}'
+        # Nothing is kept here: the hosted page and the webhook are rebuilt from the local CheckoutSession,
+        # so this works with several worker processes and survives restarts
+        return HostedCheckout(session_id, reverse('fake_checkout', args=[session_id]))
+
+    def construct_event(self, payload, signature):
+        # Same header format and HMAC as Stripe, so events signed for the real endpoint verify here too
+        body = payload.decode('utf-8') if isinstance(payload, bytes) else payload
+        try:
+            timestamp = int(dict(part.split('=', 1) for part in signature.split(','))['t'])
+            event = json.loads(body)
+        except (AttributeError, KeyError, ValueError) as e:
+            raise WebhookError(str(e))
+        if not hmac.compare_digest(signature, sign_payload(body, self.webhook_secret, timestamp)):
+            raise WebhookError("No signature matches the payload")
+        return event
+
+    def complete_session(self, session_id, payment_status='paid', event_type='checkout.session.completed'):
+        # What Stripe does once the member submits the hosted form: sign the event and deliver it.
+        # Returns whatever applying it returned (True if the dues were paid), or the HTTP status for webhook_url.
+        checkout = CheckoutSession.objects.get(session_id=session_id)
+        event = build_event(event_type, checkout_session_object(checkout, payment_status=payment_status))
+        payload, signature = encode_event(event, self.webhook_secret)
+        self._wait(self.webhook_latency)
+        if self.webhook_url:
+            return post_payload(payload, signature, self.webhook_url)
+        return handle_webhook_event(self.construct_event(payload, signature))
+
+
+@lru_cache(maxsize=None)
+def get_payment_provider():
+    config = settings.PAYMENT_PROVIDER
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+@receiver(setting_changed)
+def reset_payment_provider(setting, **kwargs):
+    if setting in ('PAYMENT_PROVIDER', 'STRIPE_SECRET_KEY', 'STRIPE_WEBHOOK_SECRET'):
+        get_payment_provider.cache_clear()
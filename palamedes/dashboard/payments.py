@@ -0,0 +1,154 @@
+# dashboard/payments.py
+# Checkout sessions and their reconciliation. The processor itself is behind payment_providers.
+# Dues are marked paid by the checkout.session.completed webhook, not by the browser coming back to
+# payment_success, so a payment is recorded even if the member closes the tab. Stripe delivers webhooks
+# at least once, so applying a session has to be idempotent.
+# Every payment, Stripe or manual, is an append-only Payment row; Due.amount is never rewritten.
+import hashlib
+import json
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import CheckoutSession, Due, Payment
+from .dues_balances import refresh_dues_balances
+
+# checkout.session.completed fires with payment_status='unpaid' for delayed payment methods (e.g. ACH);
+# those are reconciled when async_payment_succeeded arrives instead.
+RECONCILE_EVENTS = ('checkout.session.completed', 'checkout.session.async_payment_succeeded')
+
+
+def checkout_idempotency_key(user, payment_type, charges, success_url='', cancel_url=''):
+    # Same member, same dues, same amounts and nothing paid on them since -> same key. A double click, or
+    # a retry after a timeout, then gets back the session the provider already made instead of a second one.
+    # Everything sent to the provider is in the key (titles and URLs too): reusing a key with different
+    # parameters is an error on Stripe's side, not a duplicate.
+    parts = [user.id, payment_type, success_url, cancel_url] + [
+        [due.pk, due.title, int(amount * 100), int(due.amount_paid * 100)] for due, amount in sorted(charges, key=lambda c: c[0].pk)
+    ]
+    return 'checkout-' + hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()[:40]
+
+
+def start_checkout(provider, user, payment_type, charges, success_url, cancel_url):
+    # charges are (due, amount) pairs. Opens a hosted checkout with the provider and records it locally;
+    # returns the provider's HostedCheckout (session id and the URL to send the member to).
+    dues = [due for due, _ in charges]
+    metadata = {'user_id': user.id, 'payment_type': payment_type}
+    if payment_type == 'bulk_payment':
+        metadata['due_ids_str'] = ",".join(str(due.pk) for due in dues)
+    else:
+        metadata['due_id'] = dues[0].pk
+
+    hosted = provider.create_checkout_session(
+        [(due.title, int(amount * 100)) for due, amount in charges], metadata, success_url, cancel_url,
+        idempotency_key=checkout_idempotency_key(user, payment_type, charges, success_url, cancel_url)
+    )
+    record_checkout_session(hosted.session_id, user, payment_type, dues, sum((amount for _, amount in charges), Decimal('0.00')))
+    return hosted
+
+
+def record_checkout_session(session_id, user, payment_type, dues, amount_total):
+    # Called right after the provider creates the session so the webhook and payment_success can find it.
+    # An idempotent retry hands back a session that's already recorded; that one is kept as it is.
+    checkout, created = CheckoutSession.objects.get_or_create(
+        session_id=session_id,
+        defaults={'user': user, 'payment_type': payment_type, 'amount_total': amount_total}
+    )
+    if created:
+        checkout.dues.set(dues)
+    return checkout
+
+
+def _due_ids_from_metadata(metadata):
+    if metadata.get('payment_type') == 'bulk_payment':
+        return [pk for pk in (metadata.get('due_ids_str') or '').split(',') if pk.strip().isdigit()]
+    due_id = str(metadata.get('due_id') or '')
+    return [due_id] if due_id.isdigit() else []
+
+
+def _checkout_from_metadata(session):
+    # Sessions created before checkout sessions were recorded locally only exist in Stripe's metadata
+    metadata = session.get('metadata') or {}
+    user_id = str(metadata.get('user_id') or '')
+    if not user_id.isdigit():
+        return None
+    checkout, created = CheckoutSession.objects.get_or_create(
+        session_id=session['id'],
+        defaults={
+            'user_id': int(user_id),
+            'payment_type': metadata.get('payment_type') or 'single',
+            'amount_total': Decimal(session.get('amount_total') or 0) / Decimal(100),
+        }
+    )
+    if created:
+        checkout.dues.set(Due.objects.filter(pk__in=_due_ids_from_metadata(metadata), assigned_to_id=checkout.user_id))
+    return checkout
+
+
+def reconcile_checkout_session(session):
+    # session is the Checkout Session object from the event payload, as a plain dict.
+    # Returns True if this call applied the payment, False if it was unpaid, unknown or already applied.
+    if session.get('payment_status') != 'paid':
+        return False
+
+    amount_paid = Decimal(session.get('amount_total') or 0) / Decimal(100)
+    with transaction.atomic():
+        checkout = CheckoutSession.objects.filter(session_id=session['id']).first() or _checkout_from_metadata(session)
+        if checkout is None:
+            return False
+
+        # Only one delivery of the event gets to flip OPEN -> COMPLETED; retries and duplicates update nothing
+        claimed = CheckoutSession.objects.filter(pk=checkout.pk, status='OPEN').update(
+            status='COMPLETED',
+            amount_total=amount_paid,
+            completed_at=timezone.now()
+        )
+        if not claimed:
+            return False
+
+        dues = Due.objects.filter(checkout_sessions=checkout, assigned_to_id=checkout.user_id)
+        if checkout.payment_type == 'bulk_payment':
+            settle_dues_in_full(dues, method='STRIPE', provider_session_id=checkout.session_id)
+        else:
+            # Partial payments are allowed, so record what was actually collected
+            due_id = dues.values_list('pk', flat=True).first()
+            if due_id:
+                apply_payment(due_id, amount_paid, method='STRIPE', provider_session_id=checkout.session_id)
+
+        # update() skips the post_save signal
+        refresh_dues_balances([checkout.user_id])
+    return True
+
+
+def handle_webhook_event(event):
+    # event is a verified webhook event as a plain dict. Anything that isn't a payment is ignored.
+    if event['type'] in RECONCILE_EVENTS:
+        return reconcile_checkout_session(event['data']['object'])
+    return False
+
+
+def apply_payment(due_id, amount, **payment_fields):
+    # Appends one Payment and moves the due's running total. Call inside a transaction.
+    Payment.objects.create(due_id=due_id, amount=amount, **payment_fields)
+    Due.objects.filter(pk=due_id).update(amount_paid=F('amount_paid') + amount)
+    Due.objects.filter(pk=due_id, is_paid=False, amount_paid__gte=F('amount')).update(is_paid=True)
+
+
+def settle_dues_in_full(dues, **payment_fields):
+    # Pays off whatever is left on each due: one multi-row INSERT into the ledger and one UPDATE,
+    # however many dues were in the checkout. Call inside a transaction.
+    open_dues = list(dues.select_for_update().filter(is_paid=False).values_list('pk', 'amount', 'amount_paid'))
+    Payment.objects.bulk_create([
+        Payment(due_id=pk, amount=amount - paid, **payment_fields) for pk, amount, paid in open_dues
+    ])
+    Due.objects.filter(pk__in=[pk for pk, _, _ in open_dues]).update(amount_paid=F('amount'), is_paid=True)
+    return len(open_dues)
+
+
+def record_manual_payment(due, amount, recorded_by):
+    # Cash / Venmo / etc. entered by the treasurer through mark_paid
+    with transaction.atomic():
+        apply_payment(due.pk, amount, method='MANUAL', recorded_by=recorded_by)
+        refresh_dues_balances([due.assigned_to_id])
+    due.refresh_from_db(fields=['amount_paid', 'is_paid'])
+    return due
@@ -0,0 +1,154 @@
+# dashboard/profile_images.py
+# Profile pictures are resized in the background instead of inside CustomUser.save.
+# Saving a member only queues their picture, and only if it's a different one (a ProfileImage row, written
+# by the post_save receiver in signals.py). The process_profile_images worker then writes a WebP copy at
+# each of IMAGE_SIZES, named after the SHA-256 of the uploaded file, and stores that hash on the member.
+# A picture that has been done before (the default one everyone starts with, the same photo uploaded
+# twice) is never processed again. Until its copies exist, templates show the original upload.
+import hashlib
+from datetime import timedelta
+from io import BytesIO
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+from users.models import CustomUser
+from .models import ProfileImage
+
+# Longest side in pixels: twice the largest size each one is shown at, for high-DPI screens
+IMAGE_SIZES = {
+    'small': 120,    # navbar, unpaid directory, dues header (up to 60px)
+    'thumb': 240,    # directory cards (120px)
+    'profile': 400,  # profile pages (up to 200px)
+}
+IMAGE_QUALITY = 80
+DERIVED_DIR = 'profile_pics/derived'
+
+WORKER_BATCH_SIZE = 20
+MAX_ATTEMPTS = 3
+# A picture claimed this long ago by a worker that never reported back is handed out again
+STALE_AFTER = timedelta(minutes=10)
+
+
+def derivative_name(content_hash, size):
+    return f'{DERIVED_DIR}/{content_hash[:2]}/{content_hash}-{size}.webp'
+
+
+def profile_image_url(member, size='thumb'):
+    if member.image_hash:
+        return default_storage.url(derivative_name(member.image_hash, size))
+    return member.image.url if member.image else ''
+
+
+# Queueing (called from signals.py)
+
+def queue_profile_image(member):
+    # Queues the member's picture unless it's the one already queued or done
+    source = member.image.name or ''
+    now = timezone.now()
+    changed = ProfileImage.objects.filter(user_id=member.pk).exclude(source=source) \
+        .update(source=source, status='PENDING', attempts=0, error='', updated_at=now)
+    if not changed:
+        _, changed = ProfileImage.objects.get_or_create(user_id=member.pk, defaults={'source': source, 'updated_at': now})
+    # The copies of the old picture stop being shown straight away
+    if changed and member.image_hash:
+        CustomUser.objects.filter(pk=member.pk).update(image_hash='')
+        member.image_hash = ''
+    return changed
+
+
+def requeue_all():
+    # Queues every member again, e.g. after adding a size (pictures already done only get the new size)
+    ProfileImage.objects.update(status='PENDING', attempts=0, error='', updated_at=timezone.now())
+    missing = CustomUser.objects.filter(profile_image__isnull=True).values_list('pk', 'image')
+    ProfileImage.objects.bulk_create([ProfileImage(user_id=pk, source=image or '') for pk, image in missing],
+                                     batch_size=500)
+    return ProfileImage.objects.count()
+
+
+# The worker
+
+def render_sizes(data):
+    # Returns {size: WebP bytes}. Each size is shrunk from the next bigger one, which is much cheaper
+    # than going back to a full-resolution photo every time.
+    results = {}
+    with Image.open(BytesIO(data)) as original:
+        # JPEGs can be decoded straight at 1/2, 1/4 or 1/8 scale, still at least as big as the largest size
+        largest = max(IMAGE_SIZES.values())
+        original.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(original)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        for size, edge in sorted(IMAGE_SIZES.items(), key=lambda item: -item[1]):
+            image.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+            output = BytesIO()
+            image.save(output, 'WEBP', quality=IMAGE_QUALITY, method=4)
+            results[size] = output.getvalue()
+    return results
+
+
+def _known_hash(source):
+    # Everyone who never uploaded a picture shares default.jpg; there's no need to read it every time
+    return ProfileImage.objects.filter(source=source, status='READY').exclude(content_hash='') \
+        .values_list('content_hash', flat=True).first()
+
+
+def process_profile_image(task):
+    # Makes sure the copies for task's picture exist and points the member at them.
+    # Returns True if anything had to be resized.
+    content_hash = _known_hash(task.source)
+    data = None
+    if not content_hash:
+        with default_storage.open(task.source, 'rb') as f:
+            data = f.read()
+        content_hash = hashlib.sha256(data).hexdigest()
+
+    missing = [size for size in IMAGE_SIZES if not default_storage.exists(derivative_name(content_hash, size))]
+    if missing:
+        if data is None:
+            with default_storage.open(task.source, 'rb') as f:
+                data = f.read()
+        rendered = render_sizes(data)
+        for size in missing:
+            default_storage.save(derivative_name(content_hash, size), ContentFile(rendered[size]))
+
+    # Only if the member hasn't uploaded something else in the meantime
+    with transaction.atomic():
+        done = ProfileImage.objects.filter(pk=task.pk, source=task.source, status='PROCESSING').update(
+            status='READY', content_hash=content_hash, error='', updated_at=timezone.now())
+        if done:
+            CustomUser.objects.filter(pk=task.pk, image=task.source).update(image_hash=content_hash)
+    return bool(missing)
+
+
+def claim_batch(limit=WORKER_BATCH_SIZE):
+    # Marks up to `limit` waiting pictures as PROCESSING and returns them, oldest first. The claim is a
+    # conditional UPDATE, so several workers never take the same one.
+    now = timezone.now()
+    waiting = ProfileImage.objects.filter(
+        Q(status='PENDING') | Q(status='PROCESSING', updated_at__lt=now - STALE_AFTER)
+    ).order_by('updated_at')
+    claimed = []
+    for task in waiting[:limit]:
+        if ProfileImage.objects.filter(pk=task.pk, status=task.status, updated_at=task.updated_at) \
+                .update(status='PROCESSING', attempts=F('attempts') + 1, updated_at=now):
+            task.status = 'PROCESSING'
+            claimed.append(task)
+    return claimed
+
+
+def process_batch(limit=WORKER_BATCH_SIZE):
+    # Returns (done, failed). A picture that can't be read or decoded is retried MAX_ATTEMPTS times, then
+    # left FAILED; the member keeps the original until they upload another one.
+    done = failed = 0
+    for task in claim_batch(limit):
+        try:
+            process_profile_image(task)
+            done += 1
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            failed += 1
+            ProfileImage.objects.filter(pk=task.pk, source=task.source).update(
+                status='FAILED' if task.attempts + 1 >= MAX_ATTEMPTS else 'PENDING',
+                error=str(e)[:255], updated_at=timezone.now())
+    return done, failed
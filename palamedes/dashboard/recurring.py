@@ -0,0 +1,148 @@
+# dashboard/recurring.py
+# Recurring dues: turns template Dues (is_template=True) plus a RecurringDue schedule into one
+# regular Due per member per billing period.
+# Generated charges remember their template and period, and a unique constraint on
+# (template, period, member) makes every run idempotent: members who already have the period's
+# charge are skipped, and a concurrent run can't double-bill either.
+from calendar import monthrange
+from datetime import date
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from .models import Due, RecurringDue
+from .bulk import resolve_target_members, BULK_CHUNK_SIZE
+from .dues_balances import refresh_dues_balances
+
+# How many schedules to hold in memory at once while walking every chapter
+SCHEDULE_BATCH_SIZE = 200
+
+# Spring runs January through July, Fall August through December
+FALL_START_MONTH = 8
+
+
+def period_start(schedule, day):
+    if schedule == 'MONTHLY':
+        return date(day.year, day.month, 1)
+    if schedule == 'SEMESTER':
+        return date(day.year, FALL_START_MONTH if day.month >= FALL_START_MONTH else 1, 1)
+    return date(day.year, 1, 1)
+
+
+def period_last_month(schedule, start):
+    if schedule == 'MONTHLY':
+        return start.month
+    if schedule == 'SEMESTER':
+        return FALL_START_MONTH - 1 if start.month == 1 else 12
+    return 12
+
+
+def period_key(schedule, start):
+    if schedule == 'MONTHLY':
+        return f'{start.year}-{start.month:02d}'
+    if schedule == 'SEMESTER':
+        return f"{start.year}-{'FA' if start.month == FALL_START_MONTH else 'SP'}"
+    return str(start.year)
+
+
+def billing_period(recurring, as_of):
+    # Returns (period key, due date) for the period containing as_of, or None if nothing is billable then
+    schedule = recurring.schedule
+    anchor = recurring.template.due_date
+    start = period_start(schedule, as_of)
+    if start < period_start(schedule, anchor):
+        return None
+    if recurring.ends_on and start > recurring.ends_on:
+        return None
+
+    # Same month into the period and same day of the month as the template (Sept 15 -> Feb 15 for
+    # semesters), pulled back into shorter periods and months (June 30 in Spring -> Dec 30 in Fall)
+    months_in = anchor.month - period_start(schedule, anchor).month
+    month = min(start.month + months_in, period_last_month(schedule, start))
+    due_date = date(start.year, month, min(anchor.day, monthrange(start.year, month)[1]))
+    return period_key(schedule, start), due_date
+
+
+def members_to_bill(recurring, period):
+    members = resolve_target_members(recurring.chapter_id, {
+        'target_group': recurring.segment,
+        'pledge_semester': recurring.pledge_semester,
+        'pledge_year': recurring.pledge_year,
+    })
+    already_billed = Due.objects.filter(template_id=recurring.template_id, period=period, assigned_to=OuterRef('pk'))
+    return members.filter(~Exists(already_billed)).order_by('pk')
+
+
+def pending_charges(recurring, as_of, chunk_size=BULK_CHUNK_SIZE):
+    # Yields lists of unsaved Dues for everyone in the segment who doesn't have this period's charge yet.
+    # Keyset over member ids, so only one chunk of a big chapter is in memory at a time.
+    billing = billing_period(recurring, as_of)
+    if billing is None:
+        return
+    period, due_date = billing
+    pending = members_to_bill(recurring, period)
+    template = recurring.template
+    last_pk = 0
+    while True:
+        ids = list(pending.filter(pk__gt=last_pk).values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield [
+            Due(title=template.title, amount=template.amount, due_date=due_date,
+                assigned_to_id=pk, template=template, period=period)
+            for pk in ids
+        ]
+        last_pk = ids[-1]
+
+
+def save_charges(dues):
+    # One transaction per batch: a multi-row INSERT and one balance refresh for every member in it,
+    # whatever chapters they belong to. Batches commit on their own, so an interrupted run just picks
+    # up where it stopped next time.
+    if not dues:
+        return
+    with transaction.atomic():
+        Due.objects.bulk_create(dues, batch_size=BULK_CHUNK_SIZE, ignore_conflicts=True)
+        refresh_dues_balances([due.assigned_to_id for due in dues])
+
+
+def bill_schedules(schedules, as_of, dry_run=False, chunk_size=BULK_CHUNK_SIZE):
+    # Yields (schedule, number billed). Most chapters only have a few dozen members, so their charges
+    # are pooled into shared batches of ~chunk_size instead of paying for a transaction per chapter.
+    # The last batch is saved once the loop finishes, so always consume this generator fully.
+    batch = []
+    for recurring in schedules:
+        billed = 0
+        for dues in pending_charges(recurring, as_of, chunk_size):
+            billed += len(dues)
+            if dry_run:
+                continue
+            batch.extend(dues)
+            if len(batch) >= chunk_size:
+                save_charges(batch)
+                batch = []
+        yield recurring, billed
+    if not dry_run:
+        save_charges(batch)
+
+
+def generate_period_charges(recurring, as_of, dry_run=False, chunk_size=BULK_CHUNK_SIZE):
+    # Bills a single schedule for the period containing as_of. Returns how many members were billed.
+    return sum(billed for _, billed in bill_schedules([recurring], as_of, dry_run, chunk_size))
+
+
+def active_schedules(chapter_id=None):
+    # Walks every active schedule in pk order, SCHEDULE_BATCH_SIZE at a time
+    schedules = RecurringDue.objects.filter(is_active=True, template__is_template=True).select_related('template').order_by('pk')
+    if chapter_id is not None:
+        schedules = schedules.filter(chapter_id=chapter_id)
+    last_pk = 0
+    while True:
+        batch = list(schedules.filter(pk__gt=last_pk)[:SCHEDULE_BATCH_SIZE])
+        if not batch:
+            return
+        yield from batch
+        last_pk = batch[-1].pk
+
+
+def run_recurring_dues(as_of, chapter_id=None, dry_run=False):
+    # Yields (schedule, number billed) for every active schedule
+    return bill_schedules(active_schedules(chapter_id), as_of, dry_run=dry_run)
@@ -0,0 +1,55 @@
+# dashboard/selection.py
+# The directory's bulk selection, kept in the session instead of in the page.
+# The directory is paginated, so checking members on page 1 and then on page 3 has to be remembered
+# somewhere between requests: each checkbox posts to directory_selection, and the Points / Bill
+# buttons hand the whole set over to manage_points_creation / manage_dues_creation.
+# Only ids of members of the requester's own chapter ever make it in.
+from users.models import CustomUser
+
+SELECTION_KEY = 'directory_selection'
+
+
+def get_selection(request):
+    return set(request.session.get(SELECTION_KEY, []))
+
+
+def _save_selection(request, selection):
+    request.session[SELECTION_KEY] = sorted(selection)
+
+
+def _chapter_member_ids(request, members):
+    return members.filter(chapter_id=request.user.chapter_id).values_list('pk', flat=True)
+
+
+def add_to_selection(request, user_ids):
+    # Returns the new size of the selection
+    user_ids = {int(pk) for pk in user_ids if str(pk).isdigit()}
+    selection = get_selection(request)
+    if user_ids:
+        selection.update(_chapter_member_ids(request, CustomUser.objects.filter(pk__in=user_ids)))
+        _save_selection(request, selection)
+    return len(selection)
+
+
+def add_members_to_selection(request, members):
+    # Adds every member of a queryset (e.g. all search results, not just the page shown). The queryset
+    # has to be limited to the requester's chapter already, as search_members results are (see search.py).
+    selection = get_selection(request)
+    selection.update(members.values_list('pk', flat=True))
+    _save_selection(request, selection)
+    return len(selection)
+
+
+def remove_from_selection(request, user_ids):
+    selection = get_selection(request) - {int(pk) for pk in user_ids if str(pk).isdigit()}
+    _save_selection(request, selection)
+    return len(selection)
+
+
+def clear_selection(request):
+    request.session.pop(SELECTION_KEY, None)
+
+
+def selected_members(request):
+    # The selection as a queryset. Members who left the chapter since being checked drop out here.
+    return CustomUser.objects.filter(chapter_id=request.user.chapter_id, pk__in=get_selection(request))
@@ -0,0 +1,121 @@
+# dashboard/signals.py
+# Bookkeeping that has to happen however a model is saved, admin included:
+# - chapter cache versions and cached summaries
+# - the materialized dues balances
+# - the member search index
+# - the profile picture queue
+# Bulk paths (bulk_create, update()) skip signals and call the same helpers themselves.
+# New database connections also get RequestMetricsMiddleware's query counter here.
+from django.db.backends.signals import connection_created
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.conf import settings
+from .models import Due, Task, Announcement, HousePoint
+from .summary import invalidate_summaries
+from .chapter_cache import bump_chapter_versions
+from .dues_balances import refresh_dues_balances, refresh_chapter_dues_balances
+from .search import index_members, unindex_members, SEARCH_FIELDS
+from .profile_images import queue_profile_image
+from .middleware import install_query_counter
+
+
+@receiver(pre_save, sender=Due)
+def due_saving(sender, instance, update_fields=None, **kwargs):
+    # A charge reassigned in the admin has to come off the previous member's balance too
+    instance._previous_assignee_id = instance.assigned_to_id
+    if instance.pk and (update_fields is None or 'assigned_to' in update_fields):
+        instance._previous_assignee_id = sender.objects.filter(pk=instance.pk).values_list('assigned_to_id', flat=True).first()
+
+
+@receiver(post_save, sender=Due)
+def due_saved(sender, instance, **kwargs):
+    # Single charges and admin edits; also drops the member's cached summary
+    refresh_dues_balances([instance.assigned_to_id, instance._previous_assignee_id])
+
+
+def _deleted_directly(origin, model):
+    # origin is whatever delete() was called on; anything else means we're part of a cascade
+    return isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+@receiver(post_delete, sender=Due)
+def due_deleted(sender, instance, origin=None, **kwargs):
+    # Dues that go because their member or chapter is being deleted are handled once by member_deleted,
+    # instead of re-totalling the chapter for every single due
+    if _deleted_directly(origin, Due):
+        refresh_dues_balances([instance.assigned_to_id], create_missing=False)
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def member_deleted(sender, instance, origin=None, **kwargs):
+    # Their balance row is gone by now; take it out of the chapter totals (unless the chapter is going too)
+    if instance.chapter_id and _deleted_directly(origin, sender):
+        refresh_chapter_dues_balances([instance.chapter_id], create_missing=False)
+
+
+@receiver(pre_save, sender=settings.AUTH_USER_MODEL)
+def member_saving(sender, instance, update_fields=None, **kwargs):
+    # A member moving chapters takes their open dues out of the old chapter's totals
+    instance._previous_chapter_id = instance.chapter_id
+    if instance.pk and (update_fields is None or set(update_fields) & {'chapter', 'chapter_id'}):
+        instance._previous_chapter_id = sender.objects.filter(pk=instance.pk).values_list('chapter_id', flat=True).first()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def member_saved(sender, instance, update_fields=None, **kwargs):
+    # Logins save last_login with update_fields; only reindex when something searchable may have changed
+    if update_fields is None or set(update_fields) & {'chapter', 'chapter_id', *SEARCH_FIELDS}:
+        index_members([instance.pk])
+    if instance._previous_chapter_id != instance.chapter_id:
+        refresh_dues_balances([instance.pk])
+        if instance._previous_chapter_id:
+            refresh_chapter_dues_balances([instance._previous_chapter_id])
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def member_unindexed(sender, instance, **kwargs):
+    unindex_members([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Task)
+def member_summary_changed(sender, instance, **kwargs):
+    invalidate_summaries([instance.assigned_to_id])
+
+
+@receiver([post_save, post_delete], sender=Announcement)
+def announcement_changed(sender, instance, **kwargs):
+    bump_chapter_versions([instance.chapter_id])
+
+
+@receiver([post_save, post_delete], sender=HousePoint)
+def house_point_changed(sender, instance, **kwargs):
+    # Approvals and submissions go through balances.apply_point_deltas, which bumps too; this catches the admin
+    bump_chapter_versions([instance.chapter_id])
+
+
+# Saves that only touch these don't change anything cached for the chapter
+MEMBER_BOOKKEEPING_FIELDS = {'last_login', 'image_hash'}
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def member_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or not set(update_fields) <= MEMBER_BOOKKEEPING_FIELDS:
+        bump_chapter_versions([instance.chapter_id])
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def member_removed(sender, instance, **kwargs):
+    bump_chapter_versions([instance.chapter_id])
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def profile_image_saved(sender, instance, update_fields=None, **kwargs):
+    # Only queues a new picture; the process_profile_images worker does the resizing
+    if update_fields is None or 'image' in update_fields:
+        queue_profile_image(instance)
+
+
+@receiver(connection_created)
+def database_connected(sender, connection, **kwargs):
+    # Lets RequestMetricsMiddleware count the queries each request runs
+    install_query_counter(connection)
@@ -0,0 +1,134 @@
+# dashboard/slow_queries.py
+# Slow-query log for the pages that tend to get slow (SLOW_QUERY_VIEWS).
+# RequestMetricsMiddleware already times every query; one slower than SLOW_QUERY_MS in a watched view
+# comes here. Every one of them is added to an in-memory table of the worst statements (shown to staff
+# on /metrics/slow-queries), keyed by the SQL with its placeholders so the same query with different
+# parameters is one row. Only a sample of them is captured in full: SQL, parameters, view and an EXPLAIN
+# plan, as one JSON line on the console or in SLOW_QUERY_LOG_FILE. The sample is SLOW_QUERY_SAMPLE_RATE of
+# the slow queries, at most SLOW_QUERY_CAPTURES_PER_MINUTE per process, and a statement's plan is reused
+# for PLAN_TTL instead of running EXPLAIN again, so a page that is slow under load isn't made slower.
+# Like the metrics, the table is per process.
+import contextlib
+import json
+import logging
+import random
+import threading
+import time
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger('palamedes.slow_queries')
+
+TOP_QUERIES = 20
+# Distinct statements kept; past that the one with the least total time is dropped
+MAX_TRACKED = 200
+PLAN_TTL = 300
+MAX_SQL_LENGTH = 4000
+MAX_PARAMS_LENGTH = 500
+# Parameters of statements containing these never leave the process: session keys, password hashes
+REDACT_IF = ('"django_session"', '"password" =')
+
+
+def slow_query_threshold():
+    # Seconds, read once per request by the middleware
+    if not settings.SLOW_QUERY_VIEWS:
+        return float('inf')
+    return settings.SLOW_QUERY_MS / 1000
+
+
+class SlowQueryTable:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.window_start = 0.0
+        self.window_captures = 0
+
+    def record(self, view, sql, params, seconds):
+        # Returns the statement's entry and whether this one should be captured in full
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(sql)
+            if entry is None:
+                if len(self.entries) >= MAX_TRACKED:
+                    del self.entries[min(self.entries, key=lambda key: self.entries[key]['total'])]
+                entry = self.entries[sql] = {'sql': sql[:MAX_SQL_LENGTH], 'count': 0, 'total': 0.0, 'max': 0.0,
+                                             'views': set(), 'plan': None, 'plan_at': 0.0}
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+            entry['views'].add(view)
+            entry['last_params'] = _params_text(sql, params)
+            entry['last_seen'] = now
+            return entry, self._take_capture(now)
+
+    def _take_capture(self, now):
+        if random.random() >= settings.SLOW_QUERY_SAMPLE_RATE:
+            return False
+        if now - self.window_start >= 60:
+            self.window_start, self.window_captures = now, 0
+        if self.window_captures >= settings.SLOW_QUERY_CAPTURES_PER_MINUTE:
+            return False
+        self.window_captures += 1
+        return True
+
+    def top(self, limit=TOP_QUERIES):
+        with self.lock:
+            entries = sorted(self.entries.values(), key=lambda entry: -entry['total'])[:limit]
+            return [{**entry, 'views': sorted(entry['views']), 'total_ms': entry['total'] * 1000,
+                     'max_ms': entry['max'] * 1000, 'mean_ms': entry['total'] * 1000 / entry['count']}
+                    for entry in entries]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+SLOW_QUERIES = SlowQueryTable()
+
+
+def _params_text(sql, params):
+    if any(marker in sql for marker in REDACT_IF):
+        return '[redacted]'
+    return repr(params)[:MAX_PARAMS_LENGTH]
+
+
+def explain(connection, sql, params):
+    # The query plan as a list of lines, or None for statements EXPLAIN isn't run on
+    if not sql.lstrip()[:6].upper().startswith(('SELECT', 'WITH')):
+        return None
+    prefix = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+    # Inside a transaction a failed EXPLAIN would break it on Postgres, so it gets a savepoint. Outside
+    # one it doesn't need a transaction at all (on SQLite that would take the write lock).
+    guard = transaction.atomic(using=connection.alias) if connection.in_atomic_block else contextlib.nullcontext()
+    try:
+        with guard, connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return [str(row[-1]) for row in cursor.fetchall()]
+    except DatabaseError as e:
+        return [f'EXPLAIN failed: {e}']
+
+
+def note_slow_query(view, sql, params, seconds, connection, many=False):
+    # Called by the middleware's query counter, with counting switched off so the EXPLAIN isn't counted
+    if view not in settings.SLOW_QUERY_VIEWS:
+        return
+    entry, capture = SLOW_QUERIES.record(view, sql, params, seconds)
+    if not capture:
+        return
+    if many:
+        plan = None
+    elif entry['plan'] is not None and time.time() - entry['plan_at'] < PLAN_TTL:
+        plan = entry['plan']
+    else:
+        plan = explain(connection, sql, params)
+        entry['plan'], entry['plan_at'] = plan, time.time()
+    logger.warning(json.dumps({
+        'time': timezone.now().isoformat(),
+        'view': view,
+        'ms': round(seconds * 1000, 2),
+        'sql': sql[:MAX_SQL_LENGTH],
+        'params': _params_text(sql, params),
+        'plan': plan,
+        'vendor': connection.vendor,
+    }))
@@ -0,0 +1,69 @@
+# dashboard/summary.py
+# The numbers on the dashboard landing page, computed in one query and cached per user.
+# Announcements are cached under the chapter's data version (see chapter_cache.py).
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Count, OuterRef, Subquery, Value, DecimalField, IntegerField
+from django.db.models.functions import Coalesce
+from users.models import CustomUser
+from .models import Task, Announcement
+from .chapter_cache import chapter_cache_key, cached_for_chapter
+
+# Safety net in case something changes a member's data without going through the invalidation hooks
+SUMMARY_TIMEOUT = 60 * 5
+ANNOUNCEMENTS_TIMEOUT = 60 * 60
+ANNOUNCEMENTS_SHOWN = 5
+
+
+def summary_cache_key(user_id):
+    return f'dashboard:summary:{user_id}'
+
+
+def announcements_cache_key(chapter_id):
+    return chapter_cache_key(chapter_id, 'announcements')
+
+
+def compute_summary(user_id):
+    # Points, pending points, unpaid dues and open tasks in a single round-trip.
+    # Points and dues come from the materialized balance rows, so only open tasks need a subquery.
+    open_tasks = Task.objects.filter(assigned_to=OuterRef('pk'), completed=False) \
+        .values('assigned_to').annotate(count=Count('id')).values('count')
+
+    return CustomUser.objects.filter(pk=user_id).annotate(
+        total_points=Coalesce(F('point_balance__approved_total'), 0),
+        pending_points=Coalesce(F('point_balance__pending_total'), 0),
+        dues_balance=Coalesce(
+            F('outstanding_dues__outstanding_total'), Value(Decimal('0.00')),
+            output_field=DecimalField(max_digits=12, decimal_places=2)
+        ),
+        pending_tasks_count=Coalesce(Subquery(open_tasks, output_field=IntegerField()), 0),
+    ).values('total_points', 'pending_points', 'dues_balance', 'pending_tasks_count').get()
+
+
+def compute_announcements(chapter_id):
+    return list(
+        Announcement.objects.filter(chapter_id=chapter_id).order_by('-date_posted')
+        .values('title', 'content', 'date_posted', author_first_name=F('author__first_name'))[:ANNOUNCEMENTS_SHOWN]
+    )
+
+
+def get_summary(user):
+    summary = cache.get(summary_cache_key(user.pk))
+    if summary is None:
+        summary = compute_summary(user.pk)
+        cache.set(summary_cache_key(user.pk), summary, SUMMARY_TIMEOUT)
+    return summary
+
+
+def get_announcements(chapter_id):
+    if not chapter_id:
+        return []
+    return cached_for_chapter(chapter_id, 'announcements', lambda: compute_announcements(chapter_id),
+                              timeout=ANNOUNCEMENTS_TIMEOUT)
+
+
+def invalidate_summaries(user_ids):
+    keys = [summary_cache_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
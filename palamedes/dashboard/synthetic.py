@@ -0,0 +1,342 @@
+# dashboard/synthetic.py
+# Production-sized fake chapters for reproducing slow pages locally (python manage.py generate_synthetic_data).
+# Everything is drawn from one random.Random(seed), so the same seed and options always give the same
+# chapters, rosters and ledgers (dates count back from --as-of).
+# Chapters, positions and members are created through the ORM. The history (millions of rows) is written
+# as plain tuples with executemany: building a model instance per row and preparing every field is most
+# of what bulk_create spends its time on. Neither path runs the model signals, so each chapter's point and
+# dues balances, search index and profile picture queue are rebuilt once at the end, the same way the
+# rebuild_* commands would.
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from django.db import connection, transaction
+from django.utils import timezone
+from homepage.admin import create_default_positions
+from users.models import Chapter, CustomUser
+from .models import HousePoint, Due, Payment, Task, Announcement, ProfileImage
+from .balances import rebuild_balances
+from .dues_balances import rebuild_dues_balances
+from .search import rebuild_member_search
+from .chapter_cache import bump_chapter_versions
+
+SYNTHETIC_UNIVERSITY = "Synthetic University"
+# Rows per executemany
+CHUNK_SIZE = 5000
+# A member stays in the chapter this many semesters after pledging
+SEMESTERS_ACTIVE = 8
+
+FIRST_NAMES = [
+    'James', 'Michael', 'David', 'Daniel', 'Matthew', 'Andrew', 'Joshua', 'Ryan', 'Tyler', 'Kevin', 'Brian',
+    'Jason', 'Justin', 'Eric', 'Brandon', 'Nathan', 'Adam', 'Aaron', 'Kyle', 'Jacob', 'Ethan', 'Noah', 'Logan',
+    'Lucas', 'Mason', 'Owen', 'Caleb', 'Dylan', 'Evan', 'Gavin', 'Isaac', 'Jordan', 'Julian', 'Marcus', 'Miguel',
+    'Carlos', 'Diego', 'Luis', 'Mateo', 'Javier', 'Wei', 'Jun', 'Hiro', 'Kenji', 'Arjun', 'Rohan', 'Vikram',
+    'Omar', 'Ali', 'Samir', 'Kwame', 'Malik', 'Andre', 'Darnell', 'Connor', 'Liam', 'Sean', 'Patrick', 'Grant',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+    'Lee', 'Perez', 'Thompson', 'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson', 'Walker',
+    'Young', 'Allen', 'King', 'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores', 'Green', 'Adams', 'Nelson',
+    'Baker', 'Hall', 'Rivera', 'Campbell', 'Mitchell', 'Carter', 'Roberts', 'Chen', 'Wang', 'Kim', 'Patel',
+    'Singh', 'Tanaka', 'Okafor', 'Mensah', 'Murphy', 'Sullivan', 'Kowalski', 'Novak', 'Rossi', 'Schmidt',
+]
+MAJORS = [
+    'Computer Science', 'Mechanical Engineering', 'Electrical Engineering', 'Business Administration',
+    'Economics', 'Biology', 'Chemistry', 'Psychology', 'Political Science', 'History', 'English', 'Mathematics',
+    'Physics', 'Sociology', 'Communications', 'Accounting', 'Finance', 'Marketing', 'Nursing', 'Kinesiology',
+    'Environmental Science', 'Civil Engineering', 'Data Science', 'Philosophy', 'Music',
+]
+HOMETOWNS = [
+    'Los Angeles, CA', 'San Diego, CA', 'Riverside, CA', 'San Jose, CA', 'Fresno, CA', 'Sacramento, CA',
+    'Irvine, CA', 'Oakland, CA', 'Bakersfield, CA', 'Phoenix, AZ', 'Las Vegas, NV', 'Portland, OR',
+    'Seattle, WA', 'Denver, CO', 'Austin, TX', 'Houston, TX', 'Dallas, TX', 'Chicago, IL', 'New York, NY',
+    'Boston, MA', 'Atlanta, GA', 'Miami, FL', 'Honolulu, HI', 'Salt Lake City, UT', 'Albuquerque, NM',
+]
+GREEK_LETTERS = [
+    'Alpha', 'Beta', 'Gamma', 'Delta', 'Epsilon', 'Zeta', 'Eta', 'Theta', 'Iota', 'Kappa', 'Lambda', 'Mu',
+    'Nu', 'Xi', 'Omicron', 'Pi', 'Rho', 'Sigma', 'Tau', 'Upsilon', 'Phi', 'Chi', 'Psi', 'Omega',
+]
+POINT_REASONS = [
+    'Community service', 'Study hours', 'Philanthropy event', 'Chapter meeting', 'Intramural game',
+    'Recruitment event', 'House cleanup', 'Alumni event', 'Fundraiser shift', 'Brotherhood event',
+    'Tabling', 'Social event setup', 'Campus involvement', 'Big/little activity', 'Interview with an active',
+]
+POINT_AMOUNTS = [1, 1, 2, 2, 2, 3, 3, 5, 5, 10]
+TASK_TITLES = [
+    'Clean the kitchen', 'Set up for chapter', 'Turn in study hours', 'Sign up for philanthropy',
+    'Update the calendar', 'Order shirts', 'Book the venue', 'Collect RSVPs', 'Take out the trash',
+    'Plan the retreat', 'Submit the budget', 'Post on social media',
+]
+# Column order of the rows each generator builds
+POINT_FIELDS = ('user', 'chapter', 'submitted_by', 'assigned_approver', 'amount', 'description', 'date_for',
+                'date_submitted', 'status', 'feedback', 'updated_at', 'version')
+DUE_FIELDS = ('title', 'amount', 'due_date', 'is_template', 'assigned_to', 'is_paid', 'amount_paid', 'period')
+PAYMENT_FIELDS = ('due', 'amount', 'method', 'provider_session_id', 'recorded_by', 'created_at')
+TASK_FIELDS = ('assigned_to', 'assigned_by', 'title', 'description', 'due_date', 'completed')
+ANNOUNCEMENT_FIELDS = ('chapter', 'author', 'title', 'content', 'date_posted')
+
+ANNOUNCEMENT_TITLES = [
+    'Chapter meeting moved', 'Philanthropy week', 'Dues reminder', 'Formal tickets on sale', 'Study hours update',
+    'Recruitment schedule', 'House cleanup this weekend', 'Alumni mixer', 'Intramural sign-ups', 'Initiation details',
+]
+
+
+def insert_rows(model, field_names, rows):
+    # INSERTs the rows (tuples in field_names order; foreign keys as ids) with executemany. Dates, datetimes
+    # and decimals go through the backend's own adapters, the last step of the fields' conversion.
+    fields = [model._meta.get_field(name) for name in field_names]
+    ops = connection.ops
+    adapters = {
+        'DateField': ops.adapt_datefield_value,
+        'DateTimeField': ops.adapt_datetimefield_value,
+        'DecimalField': ops.adapt_decimalfield_value,
+    }
+    converters = [(i, adapters[field.get_internal_type()]) for i, field in enumerate(fields)
+                  if field.get_internal_type() in adapters]
+    if converters:
+        rows = [list(row) for row in rows]
+        for row in rows:
+            for i, adapt in converters:
+                if row[i] is not None:
+                    row[i] = adapt(row[i])
+    quote = ops.quote_name
+    sql = (f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(quote(field.column) for field in fields)}) "
+           f"VALUES ({', '.join(['%s'] * len(fields))})")
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def semesters(as_of, years):
+    # [(season, year, first day)] oldest first, ending with the semester as_of falls in
+    found = []
+    for year in range(as_of.year - years, as_of.year + 1):
+        for season, start in (('Spring', date(year, 1, 15)), ('Fall', date(year, 8, 20))):
+            if start <= as_of:
+                found.append((season, year, start))
+    return found[-(years * 2):] or found[-1:]
+
+
+def parse_member_counts(value):
+    # "150" or "80-400" (a count drawn per chapter)
+    low, _, high = str(value).partition('-')
+    low = int(low)
+    return low, int(high or low)
+
+
+class ChapterGenerator:
+    def __init__(self, rng, as_of, options, password):
+        self.rng = rng
+        self.as_of = as_of
+        self.options = options
+        self.password = password
+        self.semesters = semesters(as_of, options['years'])
+        self.timezone = timezone.get_current_timezone()
+        self.counts = {}
+        self.session_number = 0
+
+    def moment(self, day, spread_days=0):
+        # An aware datetime on `day` (plus up to spread_days), never after the as_of date
+        if spread_days:
+            day = min(day + timedelta(days=self.rng.randint(0, spread_days)), self.as_of)
+        return datetime.combine(min(day, self.as_of), time(self.rng.randint(8, 22), self.rng.randint(0, 59)),
+                                tzinfo=self.timezone)
+
+    def day_in(self, index):
+        # A random day of semester `index`
+        start = self.semesters[index][2]
+        end = self.semesters[index + 1][2] if index + 1 < len(self.semesters) else self.as_of + timedelta(days=1)
+        return start + timedelta(days=self.rng.randrange(max((end - start).days, 1)))
+
+    def insert(self, model, fields, rows):
+        insert_rows(model, fields, rows)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + len(rows)
+        rows.clear()
+
+    def generate(self, number):
+        rng = self.rng
+        code = f'SYN{rng.getrandbits(28):07X}'
+        if Chapter.objects.filter(invite_code=code).exists():
+            raise ValueError(f"Chapter {number} of this seed ({code}) is already in the database.")
+        chapter = Chapter.objects.create(
+            name=f"{rng.choice(GREEK_LETTERS)} {rng.choice(GREEK_LETTERS)} {number}",
+            university=SYNTHETIC_UNIVERSITY, invite_code=code,
+        )
+        positions = {position.title: position for position in create_default_positions(chapter)}
+        members = self.roster(chapter, code, positions)
+        officers = [member.pk for member in members if member.position_id != positions['No Position'].pk]
+        actives = [member.pk for member in members if member.status == 'ACT']
+
+        self.points(chapter, members, officers, actives)
+        self.dues(chapter, members, officers)
+        self.tasks(members, officers)
+        self.announcements(chapter, officers)
+
+        # What the signals would have done row by row
+        ProfileImage.objects.bulk_create([ProfileImage(user_id=member.pk, source=member.image.name) for member in members])
+        rebuild_balances(chapter)
+        rebuild_dues_balances(chapter)
+        rebuild_member_search(chapter.id)
+        bump_chapter_versions([chapter.id])
+        return chapter, len(members)
+
+    def roster(self, chapter, code, positions):
+        rng = self.rng
+        low, high = parse_member_counts(self.options['members'])
+        size = max(rng.randint(low, high), 4)
+        new_members = round(size * self.options['nm_ratio'])
+        current = len(self.semesters) - 1
+        members = []
+        for i in range(size):
+            if i < new_members:
+                status, pledged = 'NM', current
+            else:
+                # Actives pledged in one of the earlier semesters they can still be around for
+                status, pledged = 'ACT', rng.randint(max(current - SEMESTERS_ACTIVE + 1, 0), max(current - 1, 0))
+            season, year, _ = self.semesters[pledged]
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            username = f'{code.lower()}_{i}'
+            member = CustomUser(
+                username=username, password=self.password, email=f'{username}@example.edu',
+                first_name=first, last_name=last, chapter=chapter, status=status,
+                position=positions['No Position'], major=rng.choice(MAJORS), hometown=rng.choice(HOMETOWNS),
+                phone_number=f'951555{rng.randrange(10000):04d}', pledge_semester=season, pledge_year=year,
+                date_joined=self.moment(self.semesters[pledged][2], 20),
+            )
+            member.pledged = pledged
+            members.append(member)
+        # The three officers are the most senior actives
+        seniors = sorted((m for m in members if m.status == 'ACT'), key=lambda m: m.pledged)
+        for member, title in zip(seniors or members, ('President', 'Vice President', 'Treasurer')):
+            member.position = positions[title]
+        CustomUser.objects.bulk_create(members, batch_size=CHUNK_SIZE)
+        self.counts['CustomUser'] = self.counts.get('CustomUser', 0) + len(members)
+        return members
+
+    def points(self, chapter, members, officers, actives):
+        # Every request and wherever its negotiation got to: recent ones are often still open
+        rng = self.rng
+        average = self.options['points']
+        rows = []
+        for member in members:
+            # New members need a specific active to sign off; actives go to any exec
+            needs_approver = member.status == 'NM' and actives
+            for index in range(member.pledged, len(self.semesters)):
+                for _ in range(rng.randint(average // 2, average + average // 2)):
+                    date_for = self.day_in(index)
+                    recent = (self.as_of - date_for).days < 14
+                    status = rng.choices(['APPROVED', 'PENDING', 'COUNTERED', 'REJECTED'],
+                                         weights=[30, 50, 15, 5] if recent else [82, 5, 3, 10])[0]
+                    amount = rng.choice(POINT_AMOUNTS)
+                    steps, feedback = 0, ''
+                    if status == 'COUNTERED' or (status == 'APPROVED' and rng.random() < 0.2):
+                        steps = rng.randint(1, 3)
+                        feedback = f"Counter-offer: {max(amount - rng.randint(1, 2), 1)} points, it was a shorter event."
+                    elif status == 'REJECTED':
+                        steps = rng.randint(0, 1)
+                        feedback = "Not a chapter event." if rng.random() < 0.5 else "No proof of attendance."
+                    submitted = self.moment(date_for, 3)
+                    rows.append((
+                        member.pk, chapter.pk, member.pk if rng.random() < 0.85 else rng.choice(officers),
+                        rng.choice(actives) if needs_approver else None, amount, rng.choice(POINT_REASONS), date_for,
+                        submitted, status, feedback, self.moment(submitted.date(), steps), steps,
+                    ))
+                    if len(rows) >= CHUNK_SIZE:
+                        self.insert(HousePoint, POINT_FIELDS, rows)
+        self.insert(HousePoint, POINT_FIELDS, rows)
+
+    def dues(self, chapter, members, officers):
+        rng = self.rng
+        semester_dues = Decimal(rng.randrange(300, 501, 25))
+        treasurer = officers[-1] if officers else None
+        dues, plans = [], []
+        for member in members:
+            for index in range(member.pledged, len(self.semesters)):
+                season, year, start = self.semesters[index]
+                charges = [(f"{season} {year} Dues", semester_dues)]
+                if index == member.pledged:
+                    charges.append((f"{season} {year} New Member Fee", Decimal('150.00')))
+                if rng.random() < 0.1:
+                    charges.append(("Missed Chapter Fine", Decimal(rng.choice([25, 30, 50]))))
+                due_date = start + timedelta(days=30)
+                for title, amount in charges:
+                    plan = self.payment_plan(amount, due_date)
+                    paid = sum((part for part, _ in plan), Decimal('0.00'))
+                    dues.append((title, amount, due_date, False, member.pk, paid >= amount, paid, ''))
+                    plans.append(plan)
+            if len(dues) >= CHUNK_SIZE:
+                self.insert_dues(chapter, dues, plans, treasurer)
+        self.insert_dues(chapter, dues, plans, treasurer)
+
+    def payment_plan(self, amount, due_date):
+        # [(amount, paid on)]: mostly paid in full once a due is old, partial payments along the way
+        rng = self.rng
+        age = (self.as_of - due_date).days
+        weights = [88, 7, 5] if age > 120 else [40, 25, 35] if age > 0 else [15, 10, 75]
+        outcome = rng.choices(['full', 'partial', 'none'], weights=weights)[0]
+        if outcome == 'none':
+            return []
+        total = amount if outcome == 'full' else (amount * rng.randint(25, 75) / 100).quantize(Decimal('0.01'))
+        installments = rng.randint(1, 3) if outcome == 'full' else rng.randint(1, 2)
+        parts = [(total / installments).quantize(Decimal('0.01'))] * (installments - 1)
+        parts.append(total - sum(parts, Decimal('0.00')))
+        first = due_date - timedelta(days=20)
+        return [(part, first + timedelta(days=rng.randint(0, 80))) for part in parts]
+
+    def insert_dues(self, chapter, dues, plans, treasurer):
+        # The dues first, then their ids back in insertion order for the payments
+        last_id = Due.objects.filter(assigned_to__chapter=chapter).order_by('-pk').values_list('pk', flat=True).first() or 0
+        self.insert(Due, DUE_FIELDS, dues)
+        due_ids = Due.objects.filter(assigned_to__chapter=chapter, pk__gt=last_id).order_by('pk').values_list('pk', flat=True)
+        payments = []
+        for due_id, plan in zip(due_ids, plans):
+            for amount, paid_on in plan:
+                stripe = self.rng.random() < 0.6
+                self.session_number += 1
+                payments.append((
+                    due_id, amount, 'STRIPE' if stripe else 'MANUAL',
+                    f'cs_synthetic_{self.session_number}' if stripe else None,
+                    None if stripe else treasurer, self.moment(paid_on),
+                ))
+            if len(payments) >= CHUNK_SIZE:
+                self.insert(Payment, PAYMENT_FIELDS, payments)
+        self.insert(Payment, PAYMENT_FIELDS, payments)
+        plans.clear()
+
+    def tasks(self, members, officers):
+        rng = self.rng
+        rows = []
+        for member in members:
+            for index in range(member.pledged, len(self.semesters)):
+                for _ in range(rng.randint(0, self.options['tasks'] * 2)):
+                    due_date = self.day_in(index) + timedelta(days=7)
+                    rows.append((
+                        member.pk, rng.choice(officers), rng.choice(TASK_TITLES), '',
+                        datetime.combine(due_date, time(23, 59), tzinfo=self.timezone),
+                        due_date < self.as_of and rng.random() < 0.85,
+                    ))
+                    if len(rows) >= CHUNK_SIZE:
+                        self.insert(Task, TASK_FIELDS, rows)
+        self.insert(Task, TASK_FIELDS, rows)
+
+    def announcements(self, chapter, officers):
+        rng = self.rng
+        rows = [
+            (chapter.pk, rng.choice(officers), rng.choice(ANNOUNCEMENT_TITLES), "See the chapter calendar for details.",
+             self.moment(self.day_in(index)))
+            for index in range(len(self.semesters))
+            for _ in range(self.options['announcements'])
+        ]
+        self.insert(Announcement, ANNOUNCEMENT_FIELDS, rows)
+
+
+def generate_chapters(options, password, as_of, on_chapter=None):
+    # Returns {model name: rows inserted}. on_chapter(chapter, number, members, counts) after each chapter.
+    generator = ChapterGenerator(random.Random(options['seed']), as_of, options, password)
+    for number in range(1, options['chapters'] + 1):
+        # One transaction per chapter: much faster on SQLite, and a failed run leaves whole chapters
+        with transaction.atomic():
+            chapter, members = generator.generate(number)
+        if on_chapter:
+            on_chapter(chapter, number, members, generator.counts)
+    return generator.counts
@@ -0,0 +1,10 @@
+from django import template
+from dashboard.profile_images import profile_image_url as _profile_image_url
+
+register = template.Library()
+
+
+@register.filter
+def profile_image_url(member, size='thumb'):
+    # {{ member|profile_image_url:'small' }}: the smallest resized copy that fits where it's shown
+    return _profile_image_url(member, size)
@@ -0,0 +1,90 @@
+# dashboard/transitions.py
+# Optimistic concurrency for the point negotiation loop.
+# A transition is a conditional UPDATE ... WHERE version = <the version the user was looking at>.
+# If somebody else moved the request first, nothing is written and the caller gets False back.
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import HousePoint
+from .balances import record_point_change, apply_point_deltas, point_delta
+
+
+def transition_point(point, expected_version=None, **changes):
+    if expected_version is None:
+        expected_version = point.version
+
+    # Only write the columns that actually change
+    changes = {field: value for field, value in changes.items() if getattr(point, field) != value}
+    changes['updated_at'] = timezone.now()
+
+    with transaction.atomic():
+        updated = HousePoint.objects.filter(pk=point.pk, version=expected_version).update(
+            version=F('version') + 1, **changes
+        )
+        if not updated:
+            return False
+
+        old_status, old_amount = point.status, point.amount
+        for field, value in changes.items():
+            setattr(point, field, value)
+        point.version = expected_version + 1
+        record_point_change(point, old_status, old_amount)
+    return True
+
+
+class BatchConflict(Exception):
+    # Raised (and rolled back) when the queue changed between reading it and writing it
+    pass
+
+
+BATCH_ACTIONS = {'approve': 'APPROVED', 'reject': 'REJECTED'}
+
+
+def exec_queue_for(user):
+    # Same rule as the exec queue in points_hub: unassigned, pending, and not my own request
+    return HousePoint.objects.filter(
+        chapter_id=user.chapter_id,
+        assigned_approver__isnull=True,
+        status='PENDING'
+    ).exclude(submitted_by=user)
+
+
+def batch_transition(user, point_ids, action, feedback=''):
+    # Approves/rejects every still-pending exec-queue item in point_ids with one UPDATE.
+    # Returns (handled_ids, skipped_points). Skipped points are the ones somebody already dealt with.
+    new_status = BATCH_ACTIONS[action]
+    point_ids = {int(pk) for pk in point_ids}
+
+    with transaction.atomic():
+        # select_for_update locks the rows on Postgres; on SQLite the count check below catches races
+        rows = list(
+            exec_queue_for(user).filter(pk__in=point_ids).select_for_update()
+            .values_list('pk', 'user_id', 'chapter_id', 'amount')
+        )
+        handled_ids = [pk for pk, _, _, _ in rows]
+
+        if handled_ids:
+            updated = exec_queue_for(user).filter(pk__in=handled_ids).update(
+                status=new_status,
+                assigned_approver=user,
+                feedback=feedback,
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+            if updated != len(handled_ids):
+                raise BatchConflict()
+
+            # Everything here was PENDING, so only the amount varies between deltas
+            deltas = {}
+            for pk, user_id, chapter_id, amount in rows:
+                key = (user_id, chapter_id)
+                delta = point_delta('PENDING', amount, new_status, amount)
+                deltas[key] = tuple(a + b for a, b in zip(deltas.get(key, (0, 0, 0, 0)), delta))
+            apply_point_deltas(deltas)
+
+    skipped = list(
+        HousePoint.objects.filter(pk__in=point_ids - set(handled_ids), chapter_id=user.chapter_id)
+        .select_related('assigned_approver')
+        .only('id', 'description', 'status', 'amount', 'assigned_approver__first_name', 'assigned_approver__last_name')
+    )
+    return handled_ids, skipped
@@ -1,45 +1,54 @@
 from django.shortcuts import render, redirect, get_object_or_404
-import stripe
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+import hmac
+import logging
 from django.conf import settings
 from django.urls import reverse
 from django.contrib import messages
+from django.utils import timezone
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Q
-from django.db.models.functions import Coalesce
-from .models import HousePoint, Due, Task, Announcement
+from django.db import transaction
+from django.db.models import Q, F
+from .models import HousePoint, Due, CheckoutSession, Payment
+from .balances import record_point_change, get_point_balance
+from .transitions import transition_point, batch_transition, exec_queue_for, BatchConflict, BATCH_ACTIONS
+from .pagination import keyset_page, LOG_SORTS
+from .leaderboard import get_leaderboard
+from .summary import get_summary, get_announcements
+from .bulk import resolve_target_members, bulk_assign_points, bulk_charge_dues
+from .aging import get_aging, iter_aging_csv_rows, AGING_BUCKETS
+from .dues_balances import get_dues_balance, get_chapter_dues_balance
+from .search import search_members
+from .selection import get_selection, add_to_selection, add_members_to_selection, remove_from_selection, clear_selection, selected_members
+from .payments import start_checkout, handle_webhook_event, record_manual_payment
+from .payment_providers import get_payment_provider, FakeProvider, WebhookError, PaymentProviderError, PaymentRequestError
+from .metrics import render_metrics
+from .slow_queries import SLOW_QUERIES
 from .forms import NMPointRequestForm, ActivePointRequestForm, DirectPointAssignmentForm, SingleDueForm, BulkDueForm, BulkPointForm
 from users.models import CustomUser
-from django.http import JsonResponse
+import csv
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse, Http404
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from django.core.paginator import Paginator
+
+logger = logging.getLogger(__name__)
 
 @login_required
 def dashboard(request):
     user = request.user
     
-    # Calculate Total Approved Points
-    points_data = HousePoint.objects.filter(user=user, status='APPROVED').aggregate(Sum('amount'))
-    total_points = points_data['amount__sum'] or 0 
-
-    pending_data = HousePoint.objects.filter(user=user, status='PENDING').aggregate(Sum('amount'))
-    pending_points = pending_data['amount__sum'] or 0
-    
-    # Calculate Total Dues Owed
-    dues_data = Due.objects.filter(assigned_to=user, is_paid=False).aggregate(Sum('amount'))
-    dues_balance = dues_data['amount__sum'] or 0.00
-    
-    # Count Pending Tasks
-    pending_tasks_count = Task.objects.filter(assigned_to=user, completed=False).count()
+    # Points, Dues Owed and Pending Tasks (one query, cached per user)
+    summary = get_summary(user)
     
-    # Get Chapter Announcements (Recent 5)
-    if user.chapter:
-        announcements = Announcement.objects.filter(chapter=user.chapter).order_by('-date_posted')[:5]
-    else:
-        announcements = []
+    # Get Chapter Announcements (Recent 5, cached per chapter)
+    announcements = get_announcements(user.chapter_id)
 
     context = {
-        'total_points': total_points,
-        'dues_balance': dues_balance,
-        'pending_tasks_count': pending_tasks_count,
+        'total_points': summary['total_points'],
+        'pending_points': summary['pending_points'],
+        'dues_balance': summary['dues_balance'],
+        'pending_tasks_count': summary['pending_tasks_count'],
         'announcements': announcements
     }
     
@@ -68,7 +77,9 @@ def submit_points(request):
             # If Active, no specific approver is set (whoever has the permission will handle)
             # If NM, the form already handled setting 'assigned_approver'
             
-            point_req.save()
+            with transaction.atomic():
+                point_req.save()
+                record_point_change(point_req)
             messages.success(request, 'Point request submitted successfully!')
             return redirect('dashboard')
     else:
@@ -93,7 +104,9 @@ def assign_points(request):
             point.assigned_approver = request.user
             point.chapter = request.user.chapter
             point.status = 'APPROVED' # Auto-approve!
-            point.save()
+            with transaction.atomic():
+                point.save()
+                record_point_change(point)
             messages.success(request, f"Points assigned to {point.user.username}!")
             return redirect('dashboard')
     else:
@@ -140,9 +153,21 @@ def assign_points(request):
 #     }
 #     return render(request, 'dashboard/inbox.html', context)
 
+def _point_conflict(request):
+    # Someone else approved/rejected/countered this request after the page was loaded
+    messages.warning(request, "This request was already updated by someone else. Please review its latest state and try again.")
+    return redirect('points_hub')
+
 @login_required
 def manage_point_request(request, pk):
     point = get_object_or_404(HousePoint, pk=pk)
+
+    # The version the user was looking at when they clicked (falls back to the current one).
+    # Checked before permissions: once someone else acts, the loser usually isn't the approver anymore.
+    version = request.POST.get('version', '')
+    expected_version = int(version) if version.isdigit() else point.version
+    if request.method == 'POST' and expected_version != point.version:
+        return _point_conflict(request)
     
     # Security: Ensure user is allowed to modify this
     is_approver = point.assigned_approver == request.user
@@ -158,41 +183,82 @@ def manage_point_request(request, pk):
         feedback = request.POST.get('feedback', '')
 
         if action == 'approve':
-            point.status = 'APPROVED'
-            point.feedback = feedback
-            if point.submitted_by == request.user:
-                pass
-            else:
-                point.assigned_approver = request.user
-            point.save()
+            changes = {'status': 'APPROVED', 'feedback': feedback}
+            if point.submitted_by != request.user:
+                changes['assigned_approver'] = request.user
+            if not transition_point(point, expected_version, **changes):
+                return _point_conflict(request)
             messages.success(request, f"Request approved for {point.amount} points.")
 
         elif action == 'reject':
-            point.status = 'REJECTED'
-            point.feedback = feedback
-            point.assigned_approver = request.user
-            point.save()
+            changes = {'status': 'REJECTED', 'feedback': feedback, 'assigned_approver': request.user}
+            if not transition_point(point, expected_version, **changes):
+                return _point_conflict(request)
             messages.warning(request, "Request rejected.")
 
         elif action == 'counter':
             try:
                 new_amount = int(request.POST.get('new_amount'))
-                point.amount = new_amount
-                point.feedback = feedback
-                
-                # SWAP LOGIC: If I am the Approver, send it back to Submitter
-                if point.status == 'PENDING':
-                    point.status = 'COUNTERED'
-                    point.assigned_approver = request.user
-                
-                # If I am the Submitter (accepting a counter but changing value), send back to Approver
-                elif point.status == 'COUNTERED':
-                    point.status = 'PENDING'
-                
-                point.save()
-                messages.info(request, f"Counter-offer sent: {new_amount} points.")
-            except ValueError:
+            except (TypeError, ValueError):
                 messages.error(request, "Invalid amount for counter-offer.")
+                return redirect('points_hub')
+
+            changes = {'amount': new_amount, 'feedback': feedback}
+
+            # SWAP LOGIC: If I am the Approver, send it back to Submitter
+            if point.status == 'PENDING':
+                changes['status'] = 'COUNTERED'
+                changes['assigned_approver'] = request.user
+
+            # If I am the Submitter (accepting a counter but changing value), send back to Approver
+            elif point.status == 'COUNTERED':
+                changes['status'] = 'PENDING'
+
+            if not transition_point(point, expected_version, **changes):
+                return _point_conflict(request)
+            messages.info(request, f"Counter-offer sent: {new_amount} points.")
+
+    return redirect('points_hub')
+
+@login_required
+def batch_manage_points(request):
+    # One permission check for the whole batch (same rule as the exec queue itself)
+    if not (request.user.position and request.user.position.can_manage_points):
+        messages.error(request, "You do not have permission to manage the exec queue.")
+        return redirect('points_hub')
+
+    if request.method != 'POST':
+        return redirect('points_hub')
+
+    action = request.POST.get('action')
+    point_ids = [pk for pk in request.POST.getlist('point_ids') if pk.isdigit()]
+    if action not in BATCH_ACTIONS or not point_ids:
+        messages.error(request, "Select at least one request, then choose Approve or Reject.")
+        return redirect('points_hub')
+
+    try:
+        handled, skipped = batch_transition(request.user, point_ids, action, request.POST.get('feedback', ''))
+    except BatchConflict:
+        messages.warning(request, "The exec queue changed while your batch was being saved. Nothing was changed, please try again.")
+        return redirect('points_hub')
+
+    if handled:
+        verb = 'Approved' if action == 'approve' else 'Rejected'
+        messages.success(request, f"{verb} {len(handled)} request{'s' if len(handled) != 1 else ''}.")
+
+    # Per-item report for everything we didn't touch
+    for point in skipped:
+        if point.status == 'PENDING' and point.assigned_approver is None:
+            reason = "you can't act on your own request"
+        elif point.assigned_approver:
+            reason = f"already {point.get_status_display().lower()} by {point.assigned_approver.first_name} {point.assigned_approver.last_name}"
+        else:
+            reason = f"already {point.get_status_display().lower()}"
+        messages.info(request, f'Skipped "{point.description}" ({point.amount} pts): {reason}.')
+
+    missing = len(set(point_ids)) - len(handled) - len(skipped)
+    if missing:
+        messages.info(request, f"Skipped {missing} request{'s' if missing != 1 else ''} that no longer exist.")
 
     return redirect('points_hub')
 
@@ -229,13 +295,27 @@ def manage_point_request(request, pk):
 #     }
 #     return render(request, 'dashboard/ledger.html', context)
 
+# Columns the points hub templates actually read (partials/point_row.html and the log tables)
+INBOX_COLUMNS = (
+    'id', 'version', 'amount', 'description', 'status', 'date_for', 'date_submitted', 'feedback',
+    'submitted_by__first_name', 'submitted_by__last_name',
+    'assigned_approver__first_name', 'assigned_approver__last_name',
+)
+LOG_COLUMNS = (
+    'id', 'amount', 'description', 'status', 'date_submitted',
+    'user__first_name', 'user__last_name',
+    'assigned_approver__first_name', 'assigned_approver__last_name',
+)
+MEMBER_COLUMNS = ('id', 'first_name', 'last_name', 'status')
+
 @login_required
 def points_hub(request):
     user = request.user
-    chapter = user.chapter
+    # Filter on the id so we don't need an extra query to load the Chapter itself
+    chapter = user.chapter_id
 
     # Summary Stats
-    total_points = user.points_received.filter(status='APPROVED').aggregate(Sum('amount'))['amount__sum'] or 0
+    total_points = get_point_balance(user).approved_total
 
     # Inbox Logic
     my_action_items = HousePoint.objects.filter(
@@ -243,34 +323,24 @@ def points_hub(request):
     ).filter(
         Q(assigned_approver=user, status='PENDING') | 
         Q(submitted_by=user, status='COUNTERED')
-    ).order_by('-date_submitted')
+    ).select_related('submitted_by', 'assigned_approver').only(*INBOX_COLUMNS).order_by('-date_submitted')
 
     exec_queue = []
     if user.position and user.position.can_manage_points:
-        exec_queue = HousePoint.objects.filter(
-            chapter=chapter,
-            assigned_approver__isnull=True,
-            status='PENDING'
-        ).exclude(submitted_by=user)
-
-    # Leaderboards
-    leaderboard_data = CustomUser.objects.filter(chapter=chapter).annotate(
-        total_points_val=Coalesce(
-            Sum('points_received__amount', filter=Q(points_received__status='APPROVED')),
-            0
-        )
-    ).order_by('-total_points_val')
-
-    active_leaderboard = [u for u in leaderboard_data if u.status != 'NM']
-    nm_leaderboard = [u for u in leaderboard_data if u.status == 'NM']
+        exec_queue = exec_queue_for(user).select_related('submitted_by', 'assigned_approver').only(*INBOX_COLUMNS)
+
+    # Leaderboards (ranked in SQL, cached per chapter)
+    leaderboard = get_leaderboard(chapter)
+    active_leaderboard = leaderboard['ACT']
+    nm_leaderboard = leaderboard['NM']
 
     # MOTHER LOGS (Split & Filtered)
     
     # Base Query
-    base_logs = HousePoint.objects.filter(chapter=chapter)
+    base_logs = HousePoint.objects.filter(chapter=chapter).select_related('user', 'assigned_approver').only(*LOG_COLUMNS)
     
     # Dropdown Data
-    all_members = CustomUser.objects.filter(chapter=chapter).order_by('first_name')
+    all_members = CustomUser.objects.filter(chapter=chapter).only(*MEMBER_COLUMNS).order_by('first_name')
     approvers_list = all_members.exclude(status='NM') 
 
     # A. Apply Filters to Base Query
@@ -282,16 +352,16 @@ def points_hub(request):
     if approver_id and approver_id.isdigit():
         base_logs = base_logs.filter(assigned_approver_id=approver_id)
 
-    # B. Apply Sorting
+    # B. Validate Sorting
     sort_param = request.GET.get('sort', '-date_submitted') 
-    if sort_param in ['amount', '-amount', 'date_submitted', '-date_submitted']:
-        base_logs = base_logs.order_by(sort_param)
-    else:
-        base_logs = base_logs.order_by('-date_submitted')
+    if sort_param not in LOG_SORTS:
+        sort_param = '-date_submitted'
 
-    # C. Split into Two Separate Lists
-    nm_logs = base_logs.filter(user__status='NM')[:50]
-    active_logs = base_logs.exclude(user__status='NM')[:50]
+    # C. Split into Two Separate Lists (each one pages on its own cursor)
+    nm_cursor = request.GET.get('nm_cursor', '')
+    act_cursor = request.GET.get('act_cursor', '')
+    nm_logs, nm_next_cursor = keyset_page(base_logs.filter(user__status='NM'), sort_param, nm_cursor)
+    active_logs, act_next_cursor = keyset_page(base_logs.exclude(user__status='NM'), sort_param, act_cursor)
 
     context = {
         'total_points': total_points,
@@ -302,6 +372,10 @@ def points_hub(request):
         
         'nm_logs': nm_logs,
         'active_logs': active_logs,
+        'nm_cursor': nm_cursor,
+        'act_cursor': act_cursor,
+        'nm_next_cursor': nm_next_cursor,
+        'act_next_cursor': act_next_cursor,
         
         'chapter_members': all_members,
         'approvers_list': approvers_list,
@@ -323,7 +397,7 @@ def dues_dashboard(request):
     my_dues = Due.objects.filter(assigned_to=user, is_paid=False).order_by('due_date')
     my_history = Due.objects.filter(assigned_to=user, is_paid=True).order_by('-due_date')
 
-    total_due = my_dues.aggregate(Sum('amount'))['amount__sum'] or 0
+    total_due = get_dues_balance(user).outstanding_total
     
     context = {
         'my_dues': my_dues,
@@ -335,7 +409,9 @@ def dues_dashboard(request):
 
 def _helper_single_transaction(request, single_form):
     if single_form.is_valid():
-        saved_due = single_form.save()
+        # The charge and the balance refresh its post_save signal runs commit together
+        with transaction.atomic():
+            saved_due = single_form.save()
         messages.success(request, f'Charge was assigned to {saved_due.assigned_to} successfully.')
         return redirect('dues_dashboard')
     return None
@@ -343,38 +419,19 @@ def _helper_single_transaction(request, single_form):
 def _helper_bulk_transaction(request, bulk_form):
     if bulk_form.is_valid():
         data = bulk_form.cleaned_data
-        target_group = data['target_group'] 
-        users_to_charge = []
-        members = CustomUser.objects.filter(chapter = request.user.chapter)
-
-        if target_group == 'ALL':
-            users_to_charge = members
-        elif target_group == 'ACTIVES':
-            users_to_charge = members.exclude(status = 'NM')
-        elif target_group == 'NMS':
-            users_to_charge = members.filter(status = 'NM')
-        elif target_group == 'PLEDGE_CLASS':
-            sem, year = members.get('pledge_semester'), members.get('pledge_year')
-
-            if sem and year:
-                users_to_charge = members.filer(pledge_semester = sem, pledge_year = year)
-        elif target_group == 'SELECTED':
-            id_string = data.get('selected_user_ids', '')
-            if id_string:
-                id_list = id_string.split(',')
-                users_to_charge = members.filter(id__in=id_list)
-
-        count = 0 
-        for u in users_to_charge:
-            Due.objects.create(
-                title=data['title'],
-                amount=data['amount'],
-                due_date=data['due_date'],
-                assigned_to=u
-            )
-            count += 1
+        users_to_charge = resolve_target_members(request.user.chapter, data, get_selection(request))
 
-        messages.success(request, f'Bulk charge assigned to {count} members.')
+        summary = bulk_charge_dues(users_to_charge, data['title'], data['amount'], data['due_date'])
+        if data['target_group'] == 'SELECTED':
+            clear_selection(request)
+
+        names = ', '.join(name for _, name in summary['members'][:5])
+        if summary['count'] > 5:
+            names += f" and {summary['count'] - 5} more"
+        if summary['count']:
+            messages.success(request, f"Bulk charge of ${summary['total']} assigned to {summary['count']} members: {names}.")
+        else:
+            messages.warning(request, "No members matched that group, so nobody was charged.")
         return redirect('dues_dashboard')
     return None
 
@@ -397,18 +454,14 @@ def manage_dues_creation(request):
             if result:
                 return result
     
-    # Handle "Pre-fill" from Directory Selection
+    # Handle "Pre-fill" from Directory Selection (the checked members are kept in the session)
     initial_data = {}
     if request.method == 'POST' and 'directory_selection' in request.POST:
         active_tab = 'bulk'
-        # Get list of IDs from the directory checkboxes
-        selected_ids = request.POST.getlist('selected_members')
-        if selected_ids:
-            initial_data = {
-                'target_group': 'SELECTED',
-                'selected_user_ids': ','.join(selected_ids)
-            }
-            messages.info(request, f"Selected {len(selected_ids)} members for billing.")
+        selected_count = selected_members(request).count()
+        if selected_count:
+            initial_data = {'target_group': 'SELECTED'}
+            messages.info(request, f"Selected {selected_count} members for billing.")
     
     bulk_form = BulkDueForm(initial=initial_data)
 
@@ -428,7 +481,37 @@ def manage_dues_creation(request):
     }
     return render(request, 'dashboard/manage_dues.html', context)
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
+@login_required
+def dues_aging(request):
+    if not (request.user.position and request.user.position.can_manage_finance):
+        messages.error(request, "Access Denied.")
+        return redirect('dues_dashboard')
+
+    report = get_aging(request.user.chapter_id)
+    labels = [label for _, label, _, _ in AGING_BUCKETS]
+    context = {
+        'report': report,
+        'bucket_labels': labels,
+        'bucket_totals': list(zip(labels, report['totals']['buckets'])),
+    }
+    return render(request, 'dashboard/dues_aging.html', context)
+
+class _Echo:
+    # csv.writer wants a file; this one just hands each formatted line back to the response
+    def write(self, value):
+        return value
+
+@login_required
+def dues_aging_export(request):
+    if not (request.user.position and request.user.position.can_manage_finance):
+        messages.error(request, "Access Denied.")
+        return redirect('dues_dashboard')
+
+    writer = csv.writer(_Echo())
+    rows = iter_aging_csv_rows(request.user.chapter_id)
+    response = StreamingHttpResponse((writer.writerow(row) for row in rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="dues-aging-{timezone.localdate().isoformat()}.csv"'
+    return response
 
 @login_required
 def payment_page(request, pk):
@@ -436,11 +519,12 @@ def payment_page(request, pk):
 
     context = {
         'due' : due, 
-        'stripe_api_key' : stripe.api_key
     }
 
     return render(request, 'dashboard/payment_page.html', context)
 
+CHECKOUT_FAILED = "We couldn't start that payment. Please try again, or pay your treasurer directly."
+
 @login_required
 def create_bulk_checkout_session(request):
     if request.POST:
@@ -448,40 +532,25 @@ def create_bulk_checkout_session(request):
 
         dues = Due.objects.filter(pk__in = ids, assigned_to = request.user)
 
-        stripe_line_items = []
-        valid_due_ids = []
-
-        for due in dues:
-            temp = {
-                        'price_data' : {
-                            'currency' : 'usd',
-                            'product_data' : {
-                                'name' : due.title
-                            },
-                            'unit_amount_decimal' : due.amount * 100
-                        }, 
-                        'quantity' : 1,
-                    }
-
-            stripe_line_items.append(temp)
-            valid_due_ids.append(str(due.id))
+        charges = [(due, due.remaining_balance) for due in dues]
 
         try:
-            bulk_checkout = stripe.checkout.Session.create(
-                line_items = stripe_line_items,
-                mode = 'payment',
-                metadata = {
-                    'user_id' : request.user.id,
-                    'payment_type': 'bulk_payment',
-                    'due_ids_str': ",".join(valid_due_ids)
-                },
+            hosted = start_checkout(
+                get_payment_provider(), request.user, 'bulk_payment', charges,
                 success_url=request.build_absolute_uri(reverse('payment_success')) + '?session_id={CHECKOUT_SESSION_ID}',
                 cancel_url=request.build_absolute_uri(reverse('dashboard')),
             )
-            return redirect(bulk_checkout.url, code = 303)
-
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
+            return redirect(hosted.url, code = 303)
+
+        except PaymentProviderError:
+            return render(request, 'dashboard/payment_unavailable.html', status=503)
+        except PaymentRequestError:
+            messages.error(request, "We couldn't start that payment. Please refresh the page and try again, or pay your treasurer directly.")
+            return redirect('dues_dashboard')
+        except Exception:
+            # Whatever went wrong stays in the server log; the member only gets a fixed message
+            logger.exception("Couldn't start a checkout for user %s", request.user.pk)
+            return JsonResponse({'error': CHECKOUT_FAILED}, status=500)
 
     return redirect('dashboard')
 
@@ -492,40 +561,30 @@ def process_payment(request, pk):
     if request.POST:
         due = get_object_or_404(Due, pk = pk, assigned_to = request.user)
 
-        amount_str = request.POST.get('due_amount') 
-        amount = int(float(amount_str) * 100)
-        title = due.title
+        try:
+            amount = Decimal(request.POST.get('due_amount')).quantize(Decimal('0.01'))
+        except (TypeError, ValueError, InvalidOperation):
+            amount = None
+        if amount is None or not amount.is_finite() or amount <= 0:
+            return JsonResponse({'error': 'Invalid payment amount'}, status=400)
 
         try:
-            checkout_session = stripe.checkout.Session.create(
-                line_items=[
-                    {
-                        'price_data' : {
-                            'currency' : 'usd',
-                            'product_data' : {
-                                'name' : title
-                            },
-                            'unit_amount_decimal' : amount
-                        }, 
-                        'quantity' : 1,
-                    }
-                ],
-
-                mode='payment',
-                metadata={
-                    'due_id': due.pk,      
-                    'user_id': request.user.id,
-                    'payment_type': 'single'
-                },
+            hosted = start_checkout(
+                get_payment_provider(), request.user, 'single', [(due, amount)],
                 success_url=request.build_absolute_uri(reverse('payment_success')) + '?session_id={CHECKOUT_SESSION_ID}',
                 cancel_url=request.build_absolute_uri(reverse('payment_page', args=[pk])),
-
             )
-
-            return redirect(checkout_session.url, code = 303)
-
-        except Exception as e:
-            return JsonResponse({'error': str(e)}, status=500)
+            return redirect(hosted.url, code = 303)
+
+        except PaymentProviderError:
+            return render(request, 'dashboard/payment_unavailable.html', status=503)
+        except PaymentRequestError:
+            messages.error(request, "We couldn't start that payment. Please refresh the page and try again, or pay your treasurer directly.")
+            return redirect('dues_dashboard')
+        except Exception:
+            # Whatever went wrong stays in the server log; the member only gets a fixed message
+            logger.exception("Couldn't start a checkout for user %s", request.user.pk)
+            return JsonResponse({'error': CHECKOUT_FAILED}, status=500)
 
     return redirect('dashboard')
 
@@ -536,53 +595,76 @@ def payment_success(request):
         messages.error(request, "Missing payment session information. Please try again.")
         return redirect('dashboard')
 
-    try:
-        session = stripe.checkout.Session.retrieve(session_id)
-    except Exception:
+    # The webhook does the actual bookkeeping; this page just reports what it has recorded so far
+    checkout = CheckoutSession.objects.filter(session_id=session_id, user=request.user).first()
+    if checkout is None:
         messages.error(request, "There was a problem verifying your payment. Please contact support if this persists.")
         return redirect('dashboard')
 
-    processed_sessions = request.session.get('processed_sessions', [])
-
-    if session.metadata['payment_type'] == 'bulk_payment':
-        due_ids_str = session.metadata.get('due_ids_str')
-        if due_ids_str:
-            due_ids = due_ids_str.split(',')
+    if checkout.status != 'COMPLETED':
+        return render(request, 'dashboard/payment_processing.html', {'checkout': checkout})
 
-            dues_paid = Due.objects.filter(pk__in = due_ids, assigned_to = request.user) 
-
-            for due in dues_paid:   
-                due.is_paid = True
-                due.amount = 0
-                due.save()
-            return render(request, 'dashboard/successful_payment.html', {'dues': dues_paid})
-
-    amount_paid = Decimal(session.amount_total) / Decimal(100)
-    due_id = session.metadata['due_id']
-
-    due = get_object_or_404(Due, pk = due_id)
+    if checkout.payment_type == 'bulk_payment':
+        payments = Payment.objects.filter(provider_session_id=session_id).select_related('due').order_by('due__due_date')
+        return render(request, 'dashboard/successful_payment.html', {'payments': payments, 'amount_paid': checkout.amount_total})
 
     context = {
-    'due':due,
-    'amount_paid': amount_paid
+    'due': checkout.dues.first(),
+    'amount_paid': checkout.amount_total
     }
+    return render(request, 'dashboard/successful_payment.html', context)
 
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    # Stripe signs every delivery with the endpoint's signing secret; anything else is rejected
+    provider = get_payment_provider()
+    if not provider.webhook_secret:
+        return HttpResponse(status=503)
+    try:
+        event = provider.construct_event(request.body, request.META.get('HTTP_STRIPE_SIGNATURE'))
+    except WebhookError:
+        return HttpResponse(status=400)
 
-    if session_id in processed_sessions:
-        return render(request, 'dashboard/successful_payment.html', context) 
-
-    processed_sessions.append(session_id)
-    request.session['processed_sessions'] = processed_sessions
-    request.session.modified = True
-
-    due.amount -= amount_paid
+    handle_webhook_event(event)
 
-    if due.amount <= 0:
-        due.is_paid = True
-    due.save()
+    # Always 200 for events we don't care about, otherwise Stripe keeps retrying them
+    return HttpResponse(status=200)
 
+@login_required
+def fake_checkout(request, session_id):
+    # Stand-in for Stripe's hosted checkout page when PAYMENT_PROVIDER is the FakeProvider
+    provider = get_payment_provider()
+    if not isinstance(provider, FakeProvider):
+        raise Http404
+    checkout = get_object_or_404(CheckoutSession, session_id=session_id, user=request.user, status='OPEN')
 
-    return render(request, 'dashboard/successful_payment.html', context)
+    if request.method == 'POST':
+        if request.POST.get('action') != 'pay':
+            return redirect('dashboard')
+        provider.complete_session(session_id)
+        return redirect(reverse('payment_success') + f'?session_id={session_id}')
+
+    return render(request, 'dashboard/fake_checkout.html', {'checkout': checkout, 'dues': checkout.dues.all()})
+
+def metrics(request):
+    # Prometheus scrape endpoint: "Authorization: Bearer <METRICS_TOKEN>", or a staff login
+    token = settings.METRICS_TOKEN
+    bearer = request.headers.get('Authorization', '')
+    if not (request.user.is_staff or (token and hmac.compare_digest(bearer, f'Bearer {token}'))):
+        return HttpResponse(status=403)
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def slow_queries(request):
+    # The worst statements seen by this process in the SLOW_QUERY_VIEWS; site staff only, it spans every chapter
+    if not request.user.is_staff:
+        return HttpResponse(status=403)
+    context = {
+        'queries': SLOW_QUERIES.top(),
+        'threshold_ms': settings.SLOW_QUERY_MS,
+        'views': settings.SLOW_QUERY_VIEWS,
+    }
+    return render(request, 'dashboard/slow_queries.html', context)
 
 @login_required
 def make_payment_treasurer(request, pk):
@@ -600,81 +682,111 @@ def mark_paid(request, pk):
     if request.user.position.can_manage_finance:
         amount = request.POST.get('amount')
         if not amount:
-            payment_amount = due.amount
+            payment_amount = due.remaining_balance
         else:
             try:
-                payment_amount = int(amount)
-            except (TypeError, ValueError):
-                messages.error(request, "Invalid payment amount. Please enter a whole number.")
+                # Cents are allowed now that the full-balance button posts the exact remaining balance
+                payment_amount = Decimal(amount).quantize(Decimal('0.01'))
+                if payment_amount.is_nan():
+                    raise ValueError(amount)
+            except (TypeError, ValueError, InvalidOperation):
+                messages.error(request, "Invalid payment amount. Please enter a dollar amount.")
                 return redirect('brothers_due', due.assigned_to.pk)
             if payment_amount < 0:
                 messages.error(request, "Invalid payment amount. Amount cannot be negative.")
                 return redirect('brothers_due', due.assigned_to.pk)
 
-        due.amount -= payment_amount
-
-        if due.amount <= 0:
-            due.is_paid = True
-        due.save()
+        record_manual_payment(due, payment_amount, request.user)
 
-        if due.amount <= 0:
+        if due.is_paid:
             messages.success(request, "Marked as Paid.")
         else:
-            messages.success(request, f'The due has been updated. {due.assigned_to.first_name }  {due.assigned_to.last_name } still has {due.amount} left to pay.')
+            messages.success(request, f'The due has been updated. {due.assigned_to.first_name }  {due.assigned_to.last_name } still has {due.remaining_balance} left to pay.')
     else:
         messages.error(request, "Only people with permission can verify payments.")
         
     return redirect('brothers_due', due.assigned_to.pk)
 
-@login_required
-def directory(request):
-    user = request.user
-    chapter = request.user.chapter
-    members = CustomUser.objects.filter(chapter=chapter).order_by('status', 'last_name', 'first_name')
+# Columns the directory cards read (the member's position comes along in the same query)
+DIRECTORY_COLUMNS = ('id', 'first_name', 'last_name', 'status', 'email', 'image', 'image_hash', 'position__title')
+DIRECTORY_PAGE_SIZE = 48
 
-    query = request.GET.get('q')
+def _directory_members(user, query, status_filter):
+    # Indexed prefix search (the index is kept per chapter), best matches first
     if query:
-        members = members.filter(
-            Q(first_name__icontains=query) | 
-            Q(last_name__icontains=query) |
-            Q(major__icontains=query) |
-            Q(hometown__icontains=query)
-        )
+        members = search_members(user.chapter_id, query).order_by('-search_rank', 'last_name', 'first_name')
+    else:
+        members = CustomUser.objects.filter(chapter_id=user.chapter_id).order_by('status', 'last_name', 'first_name')
 
-    status_filter = request.GET.get('status')
     if status_filter:
         members = members.filter(status=status_filter)
-    
+    return members
+
+@login_required
+def directory(request):
+    query = request.GET.get('q') or ""
+    status_filter = request.GET.get('status') or ""
+    members = _directory_members(request.user, query, status_filter).select_related('position').only(*DIRECTORY_COLUMNS)
+    page = Paginator(members, DIRECTORY_PAGE_SIZE).get_page(request.GET.get('page'))
+
     context = {
-        'members': members,
-        'search_query': query or ""
+        'page': page,
+        'members': page.object_list,
+        'selected_ids': get_selection(request),
+        'search_query': query,
+        'status_filter': status_filter,
     }
+    # "Load more" asks for just the next page of cards to append
+    if request.GET.get('fragment'):
+        return render(request, 'dashboard/partials/directory_cards.html', context)
     return render(request, 'dashboard/directory.html', context)
 
+@login_required
+def directory_selection(request):
+    # GET: the selection's size and emails (for Mass Email). POST: change it, returns the new size.
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        if action == 'add':
+            count = add_to_selection(request, request.POST.getlist('member'))
+        elif action == 'remove':
+            count = remove_from_selection(request, request.POST.getlist('member'))
+        elif action == 'add_all':
+            # Everyone matching the directory's current search, not just the loaded pages
+            members = _directory_members(request.user, request.POST.get('q'), request.POST.get('status'))
+            count = add_members_to_selection(request, members)
+        elif action == 'clear':
+            clear_selection(request)
+            count = 0
+        else:
+            return JsonResponse({'error': 'Unknown action'}, status=400)
+        return JsonResponse({'count': count})
+
+    emails = list(selected_members(request).exclude(email='').values_list('email', flat=True))
+    return JsonResponse({'count': len(get_selection(request)), 'emails': emails})
+
 @login_required
 def unpaid_directory(request):
     user = request.user
     chapter = request.user.chapter 
-    members = CustomUser.objects.filter(dues__is_paid = False, chapter = chapter).distinct() \
-        .annotate(total_dues=Sum('dues__amount')
-    )
-
     member_filter = request.GET.get('filter')
     if member_filter:
-        members = members.filter(
-            Q(first_name__icontains = member_filter) |
-            Q(last_name__icontains = member_filter) |
-            Q(major__icontains = member_filter) |
-            Q(hometown__icontains = member_filter)
-    )
+        members = search_members(user.chapter_id, member_filter).order_by('-search_rank', 'last_name', 'first_name')
+    else:
+        members = CustomUser.objects.filter(chapter = chapter)
+
+    # Straight off the materialized balance rows: no join over every due the chapter has ever issued
+    members = members.filter(outstanding_dues__open_count__gt = 0) \
+        .annotate(total_dues=F('outstanding_dues__outstanding_total'), oldest_due_date=F('outstanding_dues__oldest_due_date'))
 
     status_filter = request.GET.get('status')
     if status_filter:
         members = members.filter(status=status_filter)
 
     context = {
-        'members' : members, 
-        'search_query' : member_filter or ""
+        'members' : members.select_related('position'), 
+        'selected_ids' : get_selection(request),
+        'search_query' : member_filter or "",
+        'chapter_balance' : get_chapter_dues_balance(chapter.id) if chapter else None
     }
 
     return render(request, 'dashboard/unpaid_directory.html', context)
@@ -714,16 +826,13 @@ def manage_points_creation(request):
         messages.error(request, "Access Denied.")
         return redirect('dashboard')
 
-    # Handle "Handoff" from Directory
+    # Handle "Handoff" from Directory (the checked members are kept in the session)
     initial_data = {}
     if request.method == 'POST' and 'directory_selection' in request.POST:
-        selected_ids = request.POST.getlist('selected_members')
-        if selected_ids:
-            initial_data = {
-                'target_group': 'SELECTED',
-                'selected_user_ids': ','.join(selected_ids)
-            }
-            messages.info(request, f"Selected {len(selected_ids)} members for point assignment.")
+        selected_count = selected_members(request).count()
+        if selected_count:
+            initial_data = {'target_group': 'SELECTED'}
+            messages.info(request, f"Selected {selected_count} members for point assignment.")
     
     form = BulkPointForm(initial=initial_data)
 
@@ -733,37 +842,21 @@ def manage_points_creation(request):
         if form.is_valid():
             data = form.cleaned_data
             
-            # Find Users (Reusing logic from Dues)
-            target = data['target_group']
-            base_qs = CustomUser.objects.filter(chapter=request.user.chapter)
-            users_to_update = []
-
-            if target == 'ALL': users_to_update = base_qs
-            elif target == 'ACTIVES': users_to_update = base_qs.exclude(status='NM')
-            elif target == 'NMS': users_to_update = base_qs.filter(status='NM')
-            elif target == 'PLEDGE_CLASS':
-                if data['pledge_semester'] and data['pledge_year']:
-                    users_to_update = base_qs.filter(pledge_semester=data['pledge_semester'], pledge_year=data['pledge_year'])
-            elif target == 'SELECTED':
-                id_string = data.get('selected_user_ids', '')
-                if id_string:
-                    users_to_update = base_qs.filter(id__in=id_string.split(','))
-
-            # Execute
-            count = 0
-            for u in users_to_update:
-                HousePoint.objects.create(
-                    user=u,
-                    submitted_by=request.user,
-                    chapter=request.user.chapter,
-                    amount=data['amount'],
-                    description=data['description'],
-                    date_for=data['date_for'],
-                    status='APPROVED', # Admin actions are auto-approved
-                    assigned_approver=request.user 
-                )
-                count += 1
+            # Find Users (Shared with Dues)
+            users_to_update = resolve_target_members(request.user.chapter, data, get_selection(request))
+
+            # Execute (one transaction, chunked bulk insert)
+            count = bulk_assign_points(
+                users_to_update.values_list('id', flat=True),
+                approver=request.user,
+                chapter=request.user.chapter,
+                amount=data['amount'],
+                description=data['description'],
+                date_for=data['date_for']
+            )
             
+            if data['target_group'] == 'SELECTED':
+                clear_selection(request)
             messages.success(request, f"Successfully processed points for {count} members.")
             return redirect('dashboard')
 
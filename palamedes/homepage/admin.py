@@ -5,6 +5,28 @@ from .models import ChapterRequest
 from users.models import Chapter, Position
 import secrets # To generate the invite code
 
+# The positions every new chapter starts with: (title, can_manage_roster, can_manage_finance,
+# can_manage_points, can_manage_tasks, can_create_positions)
+DEFAULT_POSITIONS = [
+    ("President", True, True, True, True, True),
+    # Vice President: Can do everything EXCEPT create positions/change President
+    ("Vice President", True, False, True, True, False),
+    # Treasurer: Money only
+    ("Treasurer", False, True, False, False, False),
+    # No position
+    ("No Position", False, False, False, False, False),
+]
+
+def create_default_positions(chapter):
+    return Position.objects.bulk_create([
+        Position(
+            chapter=chapter, title=title,
+            can_manage_roster=roster, can_manage_finance=finance,
+            can_manage_points=points, can_manage_tasks=tasks, can_create_positions=positions
+        )
+        for title, roster, finance, points, tasks, positions in DEFAULT_POSITIONS
+    ])
+
 def approve_requests(modeladmin, request, queryset):
     for req in queryset:
         if req.is_approved:
@@ -22,32 +44,7 @@ def approve_requests(modeladmin, request, queryset):
         )
 
         # Create default positions for the chapter
-        Position.objects.create(
-            chapter=chapter, title="President",
-            can_manage_roster=True, can_manage_finance=True, 
-            can_manage_points=True, can_manage_tasks=True, can_create_positions=True
-        )
-        
-        # Vice President: Can do everything EXCEPT create positions/change President
-        Position.objects.create(
-            chapter=chapter, title="Vice President",
-            can_manage_roster=True, can_manage_finance=False, 
-            can_manage_points=True, can_manage_tasks=True, can_create_positions=False
-        )
-
-        # Treasurer: Money only
-        Position.objects.create(
-            chapter=chapter, title="Treasurer",
-            can_manage_roster=False, can_manage_finance=True, 
-            can_manage_points=False, can_manage_tasks=False, can_create_positions=False
-        )
-
-        # No position
-        Position.objects.create(
-            chapter=chapter, title="No Position",
-            can_manage_roster=False, can_manage_finance=False, 
-            can_manage_points=False, can_manage_tasks=False, can_create_positions=False
-        )
+        create_default_positions(chapter)
 
         # 4. Mark request as approved
         req.is_approved = True
@@ -0,0 +1,48 @@
+# palamedes/caches.py
+# CACHES['default'] from the environment.
+#
+#   CACHE_URL           locmem:// (the default), file:///absolute/path or file://relative/path (relative to
+#                       the project), or redis://[:password@]host:6379/0 (rediss:// for TLS)
+#   CACHE_MAX_ENTRIES   locmem and file only: entries kept before old ones are culled (default 5000)
+#   CACHE_TIMEOUT       Redis only: seconds to wait on the server before giving up (default 0.5)
+#
+# locmem is per process: with several workers each has its own copy, and a chapter's version bump (see
+# dashboard/chapter_cache.py) only reaches the worker that made it. Fine for development and a single
+# process; anything bigger wants the file cache (one machine) or Redis.
+import os
+from pathlib import Path
+from urllib.parse import urlsplit, unquote
+
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_REDIS_TIMEOUT = 0.5
+KEY_PREFIX = 'palamedes'
+
+
+def cache_config(base_dir, env=os.environ):
+    url = urlsplit(env.get('CACHE_URL') or 'locmem://')
+    max_entries = int(env.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+    if url.scheme == 'locmem':
+        config = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': url.netloc or 'palamedes',
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+    elif url.scheme == 'file':
+        path = Path(unquote(url.netloc + url.path))
+        config = {
+            'BACKEND': 'dashboard.cache_backends.LockedFileCache',
+            'LOCATION': str(path if path.is_absolute() else Path(base_dir) / path),
+            'OPTIONS': {'MAX_ENTRIES': max_entries},
+        }
+    elif url.scheme in ('redis', 'rediss'):
+        # Django's own Redis backend (redis-py); the URL is handed over as is
+        timeout = float(env.get('CACHE_TIMEOUT', DEFAULT_REDIS_TIMEOUT))
+        config = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': env['CACHE_URL'],
+            'OPTIONS': {'socket_timeout': timeout, 'socket_connect_timeout': timeout},
+        }
+    else:
+        raise ValueError(f"Unsupported CACHE_URL scheme {url.scheme!r} (use locmem://, file:// or redis://)")
+    config['KEY_PREFIX'] = KEY_PREFIX
+    return config
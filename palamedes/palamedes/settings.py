@@ -13,6 +13,8 @@ from dotenv import load_dotenv
 import os
 
 from pathlib import Path
+from .database import database_config
+from .caches import cache_config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -50,6 +52,8 @@ INSTALLED_APPS = [
 AUTH_USER_MODEL = 'users.CustomUser'
 
 MIDDLEWARE = [
+    # First, so its timings cover all the other middleware too
+    'dashboard.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,11 +86,17 @@ WSGI_APPLICATION = 'palamedes.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# DATABASE_URL and friends, see palamedes/database.py (SQLite in db.sqlite3 by default)
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
+}
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/ref/settings/#caches
+
+# CACHE_URL and friends, see palamedes/caches.py (per-process local memory by default)
+CACHES = {
+    'default': cache_config(BASE_DIR),
 }
 
 
@@ -152,4 +162,52 @@ MEDIA_URL = '/media/'
 
 STRIPE_PUBLIC_KEY = 'pk_test_51Sn9SdC9aeKFAcVNlNXjCbCAjqMAhW4PPt96tc3b6fRwl7X0y2NcTnjql5zldB7FjvTHFp98NBrNmMxH1SFxvNKF00XaZngjLJ'
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY', '')
+# Signing secret of the dues webhook endpoint (whsec_...), from the Stripe dashboard or `stripe listen`
+STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
+
+# Payment processor behind dues checkout. PAYMENT_PROVIDER=dashboard.payment_providers.FakeProvider runs
+# checkout end to end without Stripe (local development, load tests); OPTIONS go to its constructor.
+# It refuses to start unless DEBUG is on, and needs STRIPE_WEBHOOK_SECRET (any value) to sign its webhooks.
+PAYMENT_PROVIDER = {
+    'BACKEND': os.environ.get('PAYMENT_PROVIDER', 'dashboard.payment_providers.StripeProvider'),
+    'OPTIONS': {},
+}
+
+# Bearer token Prometheus sends when scraping /metrics (staff can also view it logged in)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Slow-query log, see dashboard/slow_queries.py. A sample of the queries slower than SLOW_QUERY_MS in
+# these views is written with its EXPLAIN plan to the console, or to the rotating SLOW_QUERY_LOG_FILE
+# when it's set (the lines hold SQL and parameters, so keep the file out of the project directory);
+# staff see the worst statements on /metrics/slow-queries.
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
+SLOW_QUERY_VIEWS = ['points_hub', 'unpaid_directory', 'brother_directory']
+SLOW_QUERY_SAMPLE_RATE = float(os.environ.get('SLOW_QUERY_SAMPLE_RATE', 0.2))
+SLOW_QUERY_CAPTURES_PER_MINUTE = 30
+SLOW_QUERY_LOG_FILE = os.environ.get('SLOW_QUERY_LOG_FILE', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        # The slow-query lines are already JSON
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'slow_queries': {
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'message',
+        } if SLOW_QUERY_LOG_FILE else {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'palamedes.slow_queries': {'handlers': ['slow_queries'], 'level': 'WARNING', 'propagate': False},
+    },
+}
 
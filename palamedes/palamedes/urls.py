@@ -18,12 +18,15 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
+from dashboard import views as dashboard_views
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('homepage.urls')),
     path('', include('users.urls')),
     path('dashboard/', include('dashboard.urls')),
+    path('metrics', dashboard_views.metrics, name='metrics'),
+    path('metrics/slow-queries', dashboard_views.slow_queries, name='slow_queries'),
 ]
 
 if settings.DEBUG:
@@ -1,7 +1,6 @@
 # users/models.py
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from PIL import Image
 
 class Chapter(models.Model):
     name = models.CharField(max_length=100, help_text="e.g. Theta Chi")
@@ -39,6 +38,8 @@ class CustomUser(AbstractUser):
     hometown = models.CharField(max_length=100, blank=True)
     bio = models.TextField(blank=True, max_length=500)
     image = models.ImageField(upload_to='profile_pics/', default='default.jpg')
+    # SHA-256 of the picture once its resized copies exist (dashboard/profile_images.py), blank until then
+    image_hash = models.CharField(max_length=64, blank=True, editable=False)
 
     SEMESTER_CHOICES = [('Fall', 'Fall'), ('Spring', 'Spring')]
     pledge_semester = models.CharField(max_length=10, choices=SEMESTER_CHOICES, blank=True, null=True)
@@ -48,12 +49,3 @@ class CustomUser(AbstractUser):
         if self.first_name and self.last_name:
             return f"{self.first_name} {self.last_name} ({self.username})"
         return self.username
-    
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        if self.image:
-            img = Image.open(self.image.path)
-            if img.height > 300 or img.width > 300:
-                output_size = (300, 300)
-                img.thumbnail(output_size)
-                img.save(self.image.path)
\ No newline at end of file